@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import datetime
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', 'src')
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SRC_DIR)
+
+import synthetic  # noqa: E402
+
+# Benchmark of the dashboard callbacks and chart builders on synthetic data.
+# For each dataset size and page it times dataset loading (index + cubes),
+# every callback and every chart builder under a few representative filter
+# combinations, and records p50/p95 latency, peak traced memory and the size
+# of the JSON sent to the browser. Results are written as JSON so runs can be
+# compared over time.
+#
+#   python benchmarks/bench_callbacks.py --rows 10000 100000 1000000 --out bench.json
+
+# callback name -> arguments after the filter values ('click' is the clicked bar)
+PAGES = {
+    'students': {
+        'module': 'pages.students',
+        'kind': 'students',
+        'click_column': 'City',
+        'callbacks': {'update_barplot': [], 'update_pie': ['click'], 'update_sunburst': ['click', None, None], 'update_financial_stress': ['click'], 'update_cohort_ranking': ['click', None]},
+        'builders': ['barplot_figure', 'sunburst_figure', 'financial_stress_figure'],
+        'builder_data': lambda data: data.cubes['charts'],
+        'filter_columns': ['Age', 'Degree', 'Gender', 'Academic Pressure Level'],
+    },
+    'professional-workers': {
+        'module': 'pages.professional_workers',
+        'kind': 'professionals',
+        'click_column': 'Profession',
+        'callbacks': {'update_barplot': [], 'update_pie': ['click'], 'update_sunburst': ['click', None, None], 'update_cohort_ranking': ['click', None]},
+        'builders': ['barplot_figure', 'sunburst_figure', 'financial_stress_figure'],
+        'builder_data': lambda data: data.cubes,
+        'filter_columns': ['Age', 'Degree', 'Gender', 'Work Pressure Level'],
+    },
+}
+
+
+def filter_combinations(df, spec):
+    # No filter, one filter, two filters, all four, and all four plus a bar click,
+    # using the most common value of each column
+    common = [df[column].value_counts().index[0] for column in spec['filter_columns']]
+    click = {'points': [{'x': df[spec['click_column']].value_counts().index[0]}]}
+    return {
+        'none': ([None] * 4, None),
+        'age': ([common[0], None, None, None], None),
+        'age+gender': ([common[0], None, common[2], None], None),
+        'all': (common, None),
+        'all+click': (common, click),
+    }
+
+
+def payload_size(value):
+    from plotly.io.json import to_json_plotly
+    if hasattr(value, 'to_plotly_json') and not hasattr(value, 'to_json'):
+        value = value.to_plotly_json()
+    return len(to_json_plotly(value))
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    # One extra traced run for peak memory (tracing slows the call down)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p95_ms': float(np.percentile(timings, 95) * 1000),
+        'peak_mem_bytes': int(peak),
+        'payload_bytes': payload_size(result),
+    }
+
+
+def bench_page(page, spec, csv_path, rows, repeat):
+    from figure_cache import FigureCache
+    from page_store import PageStore
+
+    module = importlib.import_module(spec['module'])
+    store = PageStore(csv_path, module.store.index_columns, module.store.cube_specs)
+
+    results = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = store.get()
+    load_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.append({'page': page, 'rows': rows, 'kind': 'load', 'target': 'PageStore.get', 'filters': None,
+                    'p50_ms': load_seconds * 1000, 'p95_ms': load_seconds * 1000, 'peak_mem_bytes': int(peak), 'payload_bytes': 0})
+
+    # Point the page at the synthetic data, with a cache that never keeps anything
+    module.store = store
+    module.figure_cache = FigureCache(max_bytes=0)
+
+    for name, (selection, click) in filter_combinations(data.df, spec).items():
+        for callback, extra in spec['callbacks'].items():
+            args = selection + [click if arg == 'click' else arg for arg in extra]
+            result = measure(lambda: getattr(module, callback)(*args), repeat)
+            results.append({'page': page, 'rows': rows, 'kind': 'callback', 'target': callback, 'filters': name, **result})
+
+        filters = module.get_filters(*selection, click)
+        for builder in spec['builders']:
+            result = measure(lambda: getattr(module, builder)(spec['builder_data'](data), filters), repeat)
+            results.append({'page': page, 'rows': rows, 'kind': 'builder', 'target': builder, 'filters': name, **result})
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard callbacks on synthetic data.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--pages', nargs='+', default=list(PAGES), choices=list(PAGES))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=None, help='where synthetic CSVs are written (default: a temp dir)')
+    parser.add_argument('--out', default='bench_results.json')
+    args = parser.parse_args()
+
+    # The pages resolve their data relative to src/, like under gunicorn --chdir src
+    os.chdir(SRC_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app  # noqa: F401  (registers the pages)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='sba-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+
+    results = []
+    for rows in args.rows:
+        for page in args.pages:
+            spec = PAGES[page]
+            csv_path = os.path.join(work_dir, f"{spec['kind']}-{rows}-{args.seed}.csv")
+            if not os.path.exists(csv_path):
+                synthetic.write_csv(spec['kind'], rows, csv_path, args.seed)
+            page_results = bench_page(page, spec, csv_path, rows, args.repeat)
+            for result in page_results:
+                print(f"{page:>21} {rows:>9} {result['kind']:>8} {result['target']:>24} {str(result['filters']):>10} "
+                      f"p50={result['p50_ms']:9.2f}ms p95={result['p95_ms']:9.2f}ms "
+                      f"peak={result['peak_mem_bytes'] / 1e6:8.1f}MB payload={result['payload_bytes']}")
+            results += page_results
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(os.path.join(BENCH_DIR, '..', args.out) if not os.path.isabs(args.out) else args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Cold start profile of the app: how long `import app` takes (what a fresh
+# gunicorn worker pays before serving), which imports it spends that time on,
+# and how long the first visit of each page takes (layout plus the callbacks of
+# the unfiltered view). Every run is a fresh interpreter.
+#
+#   python benchmarks/boot_time.py [--runs 3] [--no-prebuilt] [--out boot.json]
+#
+# --no-prebuilt ignores the figures of src/prebuild_figures.py, as on a first
+# deploy without them.
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Packages reported in the import breakdown: cumulative time of their first
+# import, whether at boot or during a first visit
+PACKAGES = [
+    'pandas', 'flask', 'dash', 'plotly.express', 'dash_bootstrap_components', 'dash_bootstrap_templates',
+    'prometheus_client', 'sklearn', 'joblib',
+]
+
+# page module -> callbacks of the unfiltered view and their arguments
+FIRST_VISIT = {
+    'pages.students': {
+        'update_barplot': [None] * 4,
+        'update_pie': [None] * 5,
+        'update_sunburst': [None] * 7,
+        'update_financial_stress': [None] * 5,
+        'update_cohort_ranking': [None] * 6,
+    },
+    'pages.professional_workers': {
+        'update_barplot': [None] * 4,
+        'update_pie': [None] * 5,
+        'update_sunburst': [None] * 7,
+        'update_cohort_ranking': [None] * 6,
+    },
+    'pages.risk_scoring': {},
+}
+
+CHILD = '''
+import contextlib, importlib, io, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+timings = {'import app': time.perf_counter() - start}
+for module_name, callbacks in json.loads(sys.argv[1]).items():
+    module = importlib.import_module(module_name)
+    start = time.perf_counter()
+    module.layout()
+    timings[f'{module_name}.layout'] = time.perf_counter() - start
+    for name, args in callbacks.items():
+        start = time.perf_counter()
+        getattr(module, name)(*args)
+        timings[f'{module_name}.{name}'] = time.perf_counter() - start
+print(json.dumps(timings))
+'''
+
+
+def parse_importtime(stderr):
+    # First cumulative time (seconds) of every module in `python -X importtime` output
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, self_us, cumulative_us, name = [part.strip() for part in line.split('|', 1)[0].split(':', 1) + line.split('|')[1:]]
+        cumulative.setdefault(name, int(cumulative_us) / 1e6)
+    return cumulative
+
+
+def run_once(env=None):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD, json.dumps(FIRST_VISIT)],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True, env=env,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(result.stderr)
+    timings.update({f'import {name}': imports[name] for name in PACKAGES if name in imports})
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import, boot and first-visit time of the app.')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-prebuilt', action='store_true', help='build every figure instead of reading the prebuilt ones')
+    parser.add_argument('--out', default=None, help='also write the median timings as JSON')
+    args = parser.parse_args()
+
+    env = {**os.environ, 'FIGURE_PREBUILT_DIR': ''} if args.no_prebuilt else None
+    runs = [run_once(env) for _ in range(args.runs)]
+    keys = list(dict.fromkeys(key for run in runs for key in run))
+    median = {key: sorted(run[key] for run in runs if key in run)[len([run for run in runs if key in run]) // 2] for key in keys}
+
+    for key, seconds in median.items():
+        print(f'{key:<55} {seconds * 1000:9.1f} ms')
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(median, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from bench_callbacks import git_commit
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Load test of the dashboard as it is deployed: starts the production command
+# (gunicorn -c gunicorn.conf.py --chdir src app:server) on a local port for
+# each worker/thread configuration, and drives it with simulated users that
+# behave like the Dash renderer in a browser. Each user opens a page, fires
+# its initial callbacks, then keeps changing dropdowns, clicking bars and
+# switching pages, with a think time in between. Requests are built from
+# /_dash-dependencies and the component values the server sent back, so the
+# harness follows the pages' callbacks without knowing them. Runs offline:
+# server and users share the machine, keep that in mind when reading numbers.
+#
+#   python benchmarks/load_test.py --configs 1x4 2x4 4x2 --users 10 50 --duration 30 [--out load.json]
+#
+# A configuration is WORKERSxTHREADS. Reports throughput, latency percentiles
+# and error rate per configuration and user count, overall and per action.
+
+PAGES = ['/students', '/professional-workers']
+CLICK_GRAPHS = {'/students': 'barplot-cgpa1', '/professional-workers': 'barplot-profession'}
+
+# Share of each user action after the first page visit
+ACTIONS = {'dropdown': 0.6, 'click': 0.3, 'page': 0.1}
+THINK_TIME = (0.5, 2.0)       # seconds between two actions of a user
+BROWSER_CONNECTIONS = 6       # requests a browser sends to one host at the same time
+REQUEST_TIMEOUT = 60
+START_TIMEOUT = 120           # seconds for gunicorn to boot and answer /
+
+PAGES_CALLBACK = '.._pages_content.children..._pages_store.data..'
+
+
+def parse_config(value):
+    workers, threads = value.lower().split('x')
+    return int(workers), int(threads)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def gunicorn_server(workers, threads, log_path):
+    # The production command on a free local port; stopped (master and workers) on exit
+    port = free_port()
+    env = {
+        **os.environ,
+        'GUNICORN_THREADS': str(threads),
+        'BACKGROUND_CALLBACKS': '0',
+        'PROMETHEUS_MULTIPROC_DIR': tempfile.mkdtemp(prefix='sba-load-metrics-'),
+    }
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--chdir', 'src', 'app:server',
+               '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f'gunicorn exited with {process.returncode}, see {log_path}')
+            with contextlib.suppress(requests.RequestException):
+                if requests.get(url, timeout=5).ok:
+                    break
+            if time.monotonic() > deadline:
+                raise SystemExit(f'gunicorn did not answer within {START_TIMEOUT}s, see {log_path}')
+            time.sleep(0.5)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def split_output(output):
+    # 'id.prop' or '..id.prop...id.prop..' -> [(id, prop), ...]
+    parts = output[2:-2].split('...') if output.startswith('..') else [output]
+    return [tuple(part.rsplit('.', 1)) for part in parts]
+
+
+def walk_layout(node, components):
+    # id -> (type, props) of every component with an id in a layout
+    if isinstance(node, list):
+        for child in node:
+            walk_layout(child, components)
+    elif isinstance(node, dict) and 'props' in node:
+        props = node['props']
+        if 'id' in props:
+            components[props['id']] = (node.get('type'), props)
+        for value in props.values():
+            walk_layout(value, components)
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []          # (start, action, callback, latency, ok)
+        self._lock = threading.Lock()
+
+    def add(self, *sample):
+        with self._lock:
+            self.samples.append(sample)
+
+
+class User:
+    # One browser tab: keeps the value of every component it has seen and sends
+    # the same _dash-update-component requests the renderer would
+
+    def __init__(self, url, dependencies, recorder, rng):
+        self.url = url
+        self.dependencies = [dep for dep in dependencies if not dep.get('clientside_function')]
+        self.recorder = recorder
+        self.rng = rng
+        self.session = requests.Session()
+        self.pool = ThreadPoolExecutor(BROWSER_CONNECTIONS)
+        self.page = None
+        self.components = {}
+        self.values = {}
+
+    def close(self):
+        self.pool.shutdown()
+        self.session.close()
+
+    def post(self, action, dep, changed):
+        outputs = split_output(dep['output'])
+        output_specs = [{'id': id_, 'property': prop} for id_, prop in outputs]
+        body = {
+            'output': dep['output'],
+            'outputs': output_specs if len(outputs) > 1 else output_specs[0],
+            'inputs': [{**item, 'value': self.values.get((item['id'], item['property']))} for item in dep['inputs']],
+            'state': [{**item, 'value': self.values.get((item['id'], item['property']))} for item in dep['state']],
+            'changedPropIds': changed,
+        }
+        start = time.monotonic()
+        response = None
+        # gunicorn closes keep-alive connections idle for 2s; like browsers, retry
+        # once on a fresh connection when a reused one turns out to be closed
+        for _ in range(2):
+            try:
+                response = self.session.post(f'{self.url}/_dash-update-component', json=body, timeout=REQUEST_TIMEOUT)
+                break
+            except requests.ConnectionError:
+                continue
+            except requests.RequestException:
+                break
+        ok = response is not None and response.status_code in (200, 204)   # 204: the callback prevented the update
+        self.recorder.add(start, action, dep['output'], time.monotonic() - start, ok)
+
+        if ok and response.status_code == 200:
+            for id_, props in response.json()['response'].items():
+                for prop, value in props.items():
+                    self.values[(id_, prop)] = value
+        return ok
+
+    def fire(self, action, deps, changed):
+        # Callbacks triggered together go out in parallel, like from the browser
+        list(self.pool.map(lambda dep: self.post(action, dep, changed), deps))
+
+    def on_page(self, dep):
+        return all(id_ in self.components for id_, _ in split_output(dep['output']))
+
+    def visit(self, page):
+        self.values[('_pages_location', 'pathname')] = page
+        self.values[('_pages_location', 'search')] = ''
+        pages_dep = next(dep for dep in self.dependencies if dep['output'] == PAGES_CALLBACK)
+        if not self.post('page', pages_dep, ['_pages_location.pathname']):
+            return
+
+        self.page = page
+        self.components = {}
+        walk_layout(self.values[('_pages_content', 'children')], self.components)
+        for id_, (_, props) in self.components.items():
+            for prop, value in props.items():
+                if prop != 'children':
+                    self.values[(id_, prop)] = value
+        self.fire('page', [dep for dep in self.dependencies
+                           if dep['output'] != PAGES_CALLBACK and not dep.get('prevent_initial_call') and self.on_page(dep)], [])
+
+    def change_dropdown(self):
+        dropdowns = [id_ for id_, (kind, props) in self.components.items() if kind == 'Dropdown' and props.get('options')]
+        id_ = self.rng.choice(dropdowns)
+        current = self.values.get((id_, 'value'))
+        options = [option['value'] for option in self.components[id_][1]['options']]
+        if self.components[id_][1].get('multi'):
+            # Multi-select: a new non-empty subset of the options
+            self.values[(id_, 'value')] = self.rng.sample(options, self.rng.randint(1, len(options)))
+        else:
+            self.values[(id_, 'value')] = self.rng.choice([value for value in options + [None] if value != current])
+        self.trigger('dropdown', id_, 'value')
+
+    def click_bar(self):
+        graph = CLICK_GRAPHS[self.page]
+        figure = self.values.get((graph, 'figure')) or {}
+        bars = [x for trace in figure.get('data', []) if isinstance(trace.get('x'), list) for x in trace['x']]
+        if not bars:
+            return
+        self.values[(graph, 'clickData')] = {'points': [{'x': self.rng.choice(bars), 'curveNumber': 0, 'pointNumber': 0}]}
+        self.trigger('click', graph, 'clickData')
+
+    def trigger(self, action, id_, prop):
+        deps = [dep for dep in self.dependencies
+                if self.on_page(dep) and any(item['id'] == id_ and item['property'] == prop for item in dep['inputs'])]
+        self.fire(action, deps, [f'{id_}.{prop}'])
+
+    def run(self, deadline):
+        self.visit(self.rng.choice(PAGES))
+        while time.monotonic() < deadline:
+            time.sleep(self.rng.uniform(*THINK_TIME))
+            if time.monotonic() >= deadline:
+                break
+            action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+            if action == 'page' or self.page is None:
+                self.visit(self.rng.choice([page for page in PAGES if page != self.page] or PAGES))
+            elif action == 'dropdown':
+                self.change_dropdown()
+            else:
+                self.click_bar()
+
+
+def summarize(samples, seconds):
+    if not samples:
+        return {'requests': 0, 'throughput_rps': 0.0, 'error_rate': 0.0}
+    latencies = np.array([sample[3] for sample in samples]) * 1000
+    errors = sum(not sample[4] for sample in samples)
+    return {
+        'requests': len(samples),
+        'throughput_rps': len(samples) / seconds,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max()),
+        'error_rate': errors / len(samples),
+    }
+
+
+def run_load(url, users, duration, warmup, seed):
+    dependencies = requests.get(f'{url}/_dash-dependencies', timeout=REQUEST_TIMEOUT).json()
+    recorder = Recorder()
+    start = time.monotonic()
+    deadline = start + warmup + duration
+
+    simulated = [User(url, dependencies, recorder, random.Random(seed * 100_003 + i)) for i in range(users)]
+    threads = []
+    for i, user in enumerate(simulated):
+        thread = threading.Thread(target=user.run, args=(deadline,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        # Users arrive spread over the warmup, not all in the same instant
+        time.sleep(warmup / users if warmup else 0)
+    for thread in threads:
+        thread.join()
+    for user in simulated:
+        user.close()
+
+    # Only requests started after the warmup count; the slowest in-flight ones end past the deadline
+    measured = [sample for sample in recorder.samples if sample[0] >= start + warmup]
+    result = {'overall': summarize(measured, duration)}
+    for action in ACTIONS:
+        result[action] = summarize([sample for sample in measured if sample[1] == action], duration)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the dashboard under gunicorn with simulated users.')
+    parser.add_argument('--configs', nargs='+', default=['1x4', '2x4', '4x2'], help='WORKERSxTHREADS')
+    parser.add_argument('--users', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds per run')
+    parser.add_argument('--warmup', type=float, default=10, help='seconds before measuring (users arrive, workers warm up)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help='also write the results as JSON')
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix='sba-load-')
+    results = []
+    for config in args.configs:
+        workers, threads = parse_config(config)
+        with gunicorn_server(workers, threads, os.path.join(log_dir, f'gunicorn-{config}.log')) as url:
+            for users in args.users:
+                result = run_load(url, users, args.duration, args.warmup, args.seed)
+                results.append({'workers': workers, 'threads': threads, 'users': users, **result})
+
+                overall = result['overall']
+                print(f"{workers}x{threads:<3} users={users:<4} {overall['throughput_rps']:7.1f} req/s "
+                      f"p50={overall.get('p50_ms', 0):8.1f}ms p95={overall.get('p95_ms', 0):8.1f}ms "
+                      f"p99={overall.get('p99_ms', 0):8.1f}ms errors={overall['error_rate']:6.2%}  "
+                      + ' '.join(f"{action}.p95={result[action].get('p95_ms', 0):.0f}ms" for action in ACTIONS))
+
+    if args.out:
+        report = {
+            'meta': {
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'duration': args.duration,
+                'warmup': args.warmup,
+                'seed': args.seed,
+                'actions': ACTIONS,
+            },
+            'results': results,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f'gunicorn logs in {log_dir}')
+
+
+if __name__ == '__main__':
+    main()
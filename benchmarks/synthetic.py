@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+import pipeline  # noqa: E402
+
+# Synthetic page datasets with the exact schema of assets/df_students.csv and
+# assets/df_work_professionals.csv. Every column is sampled from its empirical
+# distribution in the bundled data, so category cardinalities and frequencies
+# stay realistic; the derived page columns are recomputed by the pipeline.
+#
+#   python benchmarks/synthetic.py students 1000000 /tmp/df_students_1M.csv
+
+TEMPLATES = {
+    'students': (pipeline.STUDENTS_FILE, 'Academic Pressure', pipeline.ACADEMIC_PRESSURE_BOUNDS),
+    'professionals': (pipeline.PROFESSIONALS_FILE, 'Work Pressure', pipeline.WORK_PRESSURE_BOUNDS),
+}
+DERIVED_COLUMNS = ['Academic Pressure Level', 'Work Pressure Level', 'Depression_numeric']
+
+
+def distributions(template):
+    # column -> (values, probabilities) from the template dataset
+    columns = [column for column in template.columns if column not in DERIVED_COLUMNS]
+    return {
+        column: (counts.index.to_numpy(), counts.to_numpy())
+        for column in columns
+        for counts in [template[column].value_counts(normalize=True)]
+    }
+
+
+def generate(kind, n_rows, seed=0, chunksize=1_000_000):
+    # Yield DataFrames of at most `chunksize` rows, `n_rows` in total
+    file_name, pressure_column, bounds = TEMPLATES[kind]
+    template = pd.read_csv(os.path.join(pipeline.ASSETS_DIR, file_name))
+    dists = distributions(template)
+    rng = np.random.default_rng(seed)
+
+    for start in range(0, n_rows, chunksize):
+        size = min(chunksize, n_rows - start)
+        chunk = pd.DataFrame({
+            column: rng.choice(values, size=size, p=probabilities)
+            for column, (values, probabilities) in dists.items()
+        })
+        yield pipeline.add_page_columns(chunk, pressure_column, bounds)[template.columns]
+
+
+def write_csv(kind, n_rows, path, seed=0):
+    with open(path, 'w', newline='') as f:
+        for i, chunk in enumerate(generate(kind, n_rows, seed)):
+            chunk.to_csv(f, index=False, header=i == 0)
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic page dataset.')
+    parser.add_argument('kind', choices=sorted(TEMPLATES))
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_csv(args.kind, args.rows, args.output, args.seed)
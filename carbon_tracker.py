@@ -1,13 +1,34 @@
+import atexit
+import contextlib
+import os
+import threading
+import time
+
 from codecarbon import OfflineEmissionsTracker
 import pandas as pd
 
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process file locking
+    fcntl = None
+
+# Next to this file, so the app (run from src/) and the notebook share it
+EMISSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emissions')
+UNITS_FILE = os.path.join(EMISSIONS_DIR, 'units.csv')
+
+project_name = "Hackathon 2 - Data/IA - Groupe 5 - "
+
+# Measure this process only, not the whole machine: every gunicorn worker runs
+# its own tracker, and its energy is split between its own units (flush_units)
+TRACKING_MODE = "process"
 
 tracker = OfflineEmissionsTracker(
-    project_name="Hackathon 2 - Data/IA - Groupe 5 - ",
-    output_dir='./emissions',
+    project_name=project_name,
+    output_dir=EMISSIONS_DIR,
     measure_power_secs=10,
     save_to_file=True,
     allow_multiple_runs=True,
+    tracking_mode=TRACKING_MODE,
     country_iso_code="FRA",
     region="",
     log_level="ERROR"  # Suppress console output
@@ -15,108 +36,198 @@ tracker = OfflineEmissionsTracker(
 
 def start_tracker():
     tracker.start()
+    _reset_window()
 
 def stop_tracker():
+    flush_units()
     tracker.stop()
 
 def update_project_name(new_project_name):
-    global tracker
+    global tracker, project_name
+    flush_units()  # Units tracked so far belong to the previous project
     tracker.stop()  # Stop the current tracker if it's running
+    project_name = f"Hackathon 2 - Data/IA - Groupe 5 - {new_project_name}"
     tracker = OfflineEmissionsTracker(
-        project_name = f"Hackathon 2 - Data/IA - Groupe 5 - {new_project_name}",
-        output_dir='./emissions',
+        project_name = project_name,
+        output_dir=EMISSIONS_DIR,
         measure_power_secs=10,
         save_to_file=True,
         allow_multiple_runs=True,
+        tracking_mode=TRACKING_MODE,
         country_iso_code="FRA",
         region="Auvergne Rhône-Alpes",
         log_level="ERROR"  # Suppress console output
     )
     tracker.start()  # Start the new tracker with the updated experiment name
-
-
-
-def show_metrics():
-    # Load emissions data from CSV file
-    emissions_df = pd.read_csv('./emissions/emissions.csv')
-    if not emissions_df.empty:
-
-        if emissions_df['project_name'].unique().size >= 1:
-            print("Total Emissions per Project:")
-            grouped_emissions_df = emissions_df.groupby('project_name')
-
-            for project_name, group in grouped_emissions_df:
-                total_emissions = group['emissions'].sum()
-                print(f"\nProject Name: {project_name}")
-                print(f"Total Emissions: {total_emissions:.2f} kg CO2")
-
-                # Calculate the difference between first and last timestamp
-                first_timestamp = pd.to_datetime(group['timestamp'].min())
-                last_timestamp = pd.to_datetime(group['timestamp'].max())
-                duration = last_timestamp - first_timestamp
-                run_duration = pd.to_timedelta(group['duration'].sum(), unit='s')
-                print(f"Run Duration: {run_duration.days} days, {run_duration.seconds // 3600:02} hours, {(run_duration.seconds // 60) % 60:02} minutes and {run_duration.seconds % 60:02} seconds")
-                print(f"Total Duration: {duration.days} days, {duration.seconds // 3600:02} hours, {(duration.seconds // 60) % 60:02} minutes and {duration.seconds % 60:02} seconds")
-
-                print(f"Energy Consumed: {group['energy_consumed'].sum():.2f} kWh")
-                print(f"CPU Power: {group['cpu_power'].sum():.2f} W")
-                print(f"GPU Power: {group['gpu_power'].sum():.2f} W")
-                print(f"RAM Power: {group['ram_power'].sum():.2f} W")
-
-                # Everyday consumption equivalences
-                total_emissions_tonnes = total_emissions / 1000  # Convert kg to tonnes
-
-                # Travel equivalences
-                travel_equivalences = {
-                    "driving a thermal car": total_emissions_tonnes * 4596,
-                    "flying by plane": total_emissions_tonnes * 4348,
-                    "driving an electric car": total_emissions_tonnes * 9671,
-                    "traveling by TGV": total_emissions_tonnes * 423729
-                }
-
-                print("\nTravel Equivalences:")
-                for activity, km in travel_equivalences.items():
-                    if km > 0.0001:
-                        print(f"  - {activity}: {km:.4f} km")
-
-                # Production equivalences
-                production_equivalences = {
-                    "televisions (40 to 49 inches)": total_emissions_tonnes * 2.4,
-                    "air conditioners": total_emissions_tonnes * 2.9,
-                    "laptops": total_emissions_tonnes * 6,
-                    "smartphones": total_emissions_tonnes * 32,
-                    "jeans": total_emissions_tonnes * 42,
-                    "cotton t-shirts": total_emissions_tonnes * 163,
-                    "liters of bottled water": total_emissions_tonnes * 2209
-                }
-
-                print("\nProduction Equivalences:")
-                for product, quantity in production_equivalences.items():
-                    if quantity > 0.0001:
-                        print(f"  - {product}: {quantity:.4f}")
-
-                # Consumption equivalences
-                consumption_equivalences = {
-                    "years of gas heating": total_emissions_tonnes * 0.2,
-                    "years of electric heating": total_emissions_tonnes * 1.5,
-                    "beef meals": total_emissions_tonnes * 138,
-                    "vegetarian meals": total_emissions_tonnes * 1962,
-                    "hours of video streaming": total_emissions_tonnes * 15621
-                }
-
-                print("\nConsumption Equivalences:")
-                for activity, value in consumption_equivalences.items():
+    _reset_window()
+
+
+# Per-unit attribution: a unit of work (a Dash callback, a pipeline step, ...)
+# is wrapped in track_unit(name), which only records its CPU and wall time in
+# memory. The running tracker is left alone; on each flush the energy and
+# emissions it measured since the previous flush are split between the units
+# in proportion to their CPU time, the rest of the process CPU time going to
+# OTHER_UNIT. Rows are appended to emissions/units.csv in batches, every
+# FLUSH_EVERY_CALLS units or FLUSH_INTERVAL_SECS seconds, and at exit.
+
+FLUSH_EVERY_CALLS = 1000
+FLUSH_INTERVAL_SECS = 60
+OTHER_UNIT = '(unattributed)'
+UNIT_COLUMNS = ['timestamp', 'project_name', 'unit', 'calls', 'cpu_seconds', 'wall_seconds', 'duration',
+                'energy_consumed', 'emissions']
+
+_units = {}            # unit -> [calls, cpu seconds, wall seconds] since the last flush
+_pending_calls = 0
+_units_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_window = {}           # tracker totals and process clocks at the last flush
+
+
+def _reset_window(energy=0.0, emissions=0.0):
+    _window.update(energy=energy, emissions=emissions, cpu=time.process_time(), wall=time.perf_counter())
+
+
+def _measured_totals():
+    # Cumulative (kWh, kg CO2) measured by the running tracker, without stopping
+    # it. Uses codecarbon internals (pinned version): flush() would also write a
+    # row to emissions.csv every time.
+    if tracker._start_time is None:
+        return None
+    tracker._measure_power_and_energy()
+    data = tracker._prepare_emissions_data()
+    return data.energy_consumed, data.emissions
+
+
+def record_unit(unit, cpu_seconds, wall_seconds):
+    global _pending_calls
+    with _units_lock:
+        totals = _units.setdefault(unit, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += cpu_seconds
+        totals[2] += wall_seconds
+        _pending_calls += 1
+        due = _pending_calls >= FLUSH_EVERY_CALLS or time.perf_counter() - _window.get('wall', 0) >= FLUSH_INTERVAL_SECS
+    if due:
+        flush_units(block=False)
+
+
+@contextlib.contextmanager
+def track_unit(unit):
+    # Context manager and decorator:  with track_unit('pipeline:transform'): ...
+    #                                 @track_unit('students:update_pie')
+    cpu, wall = time.thread_time(), time.perf_counter()
+    try:
+        yield
+    finally:
+        record_unit(unit, time.thread_time() - cpu, time.perf_counter() - wall)
+
+
+def flush_units(block=True):
+    # Attribute the energy measured since the last flush to the recorded units
+    # and append one row per unit to emissions/units.csv
+    global _pending_calls
+    if not _flush_lock.acquire(blocking=block):
+        return  # Another thread is flushing
+    try:
+        with _units_lock:
+            units, _pending_calls = dict(_units), 0
+            _units.clear()
+        if not units:
+            return
+
+        totals = _measured_totals()
+        energy, emissions = (totals[0] - _window['energy'], totals[1] - _window['emissions']) if totals else (None, None)
+        process_cpu = time.process_time() - _window['cpu']
+        duration = time.perf_counter() - _window['wall']
+        if totals:
+            _reset_window(*totals)
+        else:
+            _reset_window()
+
+        unit_cpu = sum(cpu for _, cpu, _ in units.values())
+        units[OTHER_UNIT] = [0, max(process_cpu - unit_cpu, 0.0), 0.0]
+        total_cpu = max(process_cpu, unit_cpu) or 1.0
+
+        timestamp = pd.Timestamp.now().strftime('%Y-%m-%dT%H:%M:%S')
+        rows = pd.DataFrame([
+            [timestamp, project_name, unit, calls, cpu, wall, duration,
+             energy * cpu / total_cpu if totals else None,
+             emissions * cpu / total_cpu if totals else None]
+            for unit, (calls, cpu, wall) in units.items()
+        ], columns=UNIT_COLUMNS)
+        _append_rows(rows)
+    finally:
+        _flush_lock.release()
+
+
+def _append_rows(rows):
+    # Every gunicorn worker appends to the same file: hold a lock while writing
+    os.makedirs(EMISSIONS_DIR, exist_ok=True)
+    with open(UNITS_FILE, 'a', newline='') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            rows.to_csv(f, header=f.tell() == 0, index=False)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def track_server(server):
+    # Attribute every Dash callback request of a Flask server to a unit named
+    # after the callback outputs, e.g. 'callback:barplot-cgpa1.figure'
+    from flask import g, request
+
+    @server.before_request
+    def start_unit():
+        if request.path.endswith('/_dash-update-component'):
+            g.carbon_unit = (time.thread_time(), time.perf_counter())
+
+    @server.teardown_request
+    def stop_unit(exc):
+        started = g.pop('carbon_unit', None)
+        if started is not None:
+            body = request.get_json(silent=True) or {}
+            record_unit(f"callback:{body.get('output', request.path)}",
+                        time.thread_time() - started[0], time.perf_counter() - started[1])
+
+
+atexit.register(flush_units)
+_reset_window()
+
+
+def show_metrics(log=None):
+    # Print the per-project totals of every emissions CSV (see emissions_analytics.py)
+    from emissions_analytics import emissions_log
+    log = log or emissions_log
+    summary = log.summary()
+    if not summary.empty:
+        print("Total Emissions per Project:")
+        equivalences = log.equivalences(summary)
+
+        for project_name, row in summary.iterrows():
+            print(f"\nProject Name: {project_name}")
+            print(f"Total Emissions: {row['emissions_kg']:.2f} kg CO2")
+
+            run_duration = pd.to_timedelta(row['run_duration_s'], unit='s')
+            duration = pd.to_timedelta(row['total_duration_s'], unit='s')
+            print(f"Run Duration: {run_duration.days} days, {run_duration.seconds // 3600:02} hours, {(run_duration.seconds // 60) % 60:02} minutes and {run_duration.seconds % 60:02} seconds")
+            print(f"Total Duration: {duration.days} days, {duration.seconds // 3600:02} hours, {(duration.seconds // 60) % 60:02} minutes and {duration.seconds % 60:02} seconds")
+
+            print(f"Energy Consumed: {row['energy_kwh']:.2f} kWh")
+            print(f"CPU Power: {row['cpu_power_w']:.2f} W")
+            print(f"GPU Power: {row['gpu_power_w']:.2f} W")
+            print(f"RAM Power: {row['ram_power_w']:.2f} W")
+
+            project = equivalences[equivalences['project_name'] == project_name]
+            for category, group in project.groupby('category', sort=False):
+                print(f"\n{category} Equivalences:")
+                for item, unit, value in group[['item', 'unit', 'value']].itertuples(index=False):
                     if value > 0.0001:
-                        print(f"  - {activity}: {value:.4f}")
-
-                # Average French carbon footprint: ~8.9 tons of CO2 per year
-                average_french_footprint_tons = 8.9
-                footprint_percentage = (total_emissions_tonnes / average_french_footprint_tons) * 100
-                if footprint_percentage > 0.0001:
-                    print(f"Percentage of the average French annual carbon footprint: {footprint_percentage:.4f}%")
-    
-
+                        print(f"  - {item}: {value:.4f}{' ' + unit if unit else ''}")
 
+            if row['footprint_pct'] > 0.0001:
+                print(f"Percentage of the average French annual carbon footprint: {row['footprint_pct']:.4f}%")
 
     else:
-        print("No emissions data available. Make sure the tracker has been started and stopped.")
\ No newline at end of file
+        print("No emissions data available. Make sure the tracker has been started and stopped.")
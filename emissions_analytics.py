@@ -0,0 +1,173 @@
+import glob
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# Per-project totals over every codecarbon session CSV in emissions/
+# (emissions.csv and the per-session exports), with everyday-life equivalences.
+#
+# EmissionsLog keeps running aggregates per file and only parses the rows
+# appended since the last refresh, so repeated reports stay cheap as the
+# files grow. A file that was rewritten rather than appended to is re-read.
+#
+#   log = EmissionsLog()
+#   report = log.report()        # {'projects': [...], 'equivalences': [...]}
+#   log.summary()                # DataFrame, one row per project
+
+EMISSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'emissions')
+
+# Columns a CSV needs to be read as a codecarbon log (emissions/units.csv is not one)
+REQUIRED_COLUMNS = ['timestamp', 'project_name', 'duration', 'emissions', 'energy_consumed', 'cpu_power', 'gpu_power', 'ram_power']
+SUM_COLUMNS = ['emissions', 'energy_consumed', 'cpu_power', 'gpu_power', 'ram_power', 'duration']
+
+# (category, item, unit, amount per tonne of CO2)
+EQUIVALENCES = [
+    ('Travel', 'driving a thermal car', 'km', 4596),
+    ('Travel', 'flying by plane', 'km', 4348),
+    ('Travel', 'driving an electric car', 'km', 9671),
+    ('Travel', 'traveling by TGV', 'km', 423729),
+    ('Production', 'televisions (40 to 49 inches)', '', 2.4),
+    ('Production', 'air conditioners', '', 2.9),
+    ('Production', 'laptops', '', 6),
+    ('Production', 'smartphones', '', 32),
+    ('Production', 'jeans', '', 42),
+    ('Production', 'cotton t-shirts', '', 163),
+    ('Production', 'liters of bottled water', '', 2209),
+    ('Consumption', 'years of gas heating', '', 0.2),
+    ('Consumption', 'years of electric heating', '', 1.5),
+    ('Consumption', 'beef meals', '', 138),
+    ('Consumption', 'vegetarian meals', '', 1962),
+    ('Consumption', 'hours of video streaming', '', 15621),
+]
+EQUIVALENCE_FACTORS = np.array([factor for *_, factor in EQUIVALENCES], dtype=float)
+
+# Average French carbon footprint: ~8.9 tons of CO2 per year
+AVERAGE_FRENCH_FOOTPRINT_TONS = 8.9
+
+FINGERPRINT_BYTES = 256
+
+
+def aggregate(rows):
+    # Rows of a codecarbon CSV -> one row of running totals per project
+    rows = rows.assign(first_timestamp=pd.to_datetime(rows['timestamp']), rows=1)
+    rows['last_timestamp'] = rows['first_timestamp']
+    return rows.groupby('project_name').agg(
+        {**{column: 'sum' for column in SUM_COLUMNS + ['rows']}, 'first_timestamp': 'min', 'last_timestamp': 'max'}
+    )
+
+
+def merge_aggregates(frames):
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return aggregate(pd.DataFrame(columns=REQUIRED_COLUMNS))
+    return pd.concat(frames).groupby(level=0).agg(
+        {**{column: 'sum' for column in SUM_COLUMNS + ['rows']}, 'first_timestamp': 'min', 'last_timestamp': 'max'}
+    )
+
+
+def equivalences(emissions_kg):
+    # Every equivalence for every project in one (projects x equivalences) product
+    return np.outer(np.asarray(emissions_kg, dtype=float) / 1000, EQUIVALENCE_FACTORS)
+
+
+class EmissionsLog:
+
+    def __init__(self, directory=EMISSIONS_DIR):
+        self.directory = directory
+        self._files = {}   # path -> {'size', 'fingerprint', 'columns', 'totals'}
+
+    def refresh(self):
+        paths = sorted(glob.glob(os.path.join(self.directory, '*.csv')))
+        for path in set(self._files) - set(paths):
+            del self._files[path]
+        for path in paths:
+            self._refresh_file(path)
+
+    def _read_fingerprint(self, path, size):
+        with open(path, 'rb') as f:
+            f.seek(max(size - FINGERPRINT_BYTES, 0))
+            return f.read(min(size, FINGERPRINT_BYTES))
+
+    def _refresh_file(self, path):
+        size = os.path.getsize(path)
+        state = self._files.get(path)
+        if state is not None:
+            if size == state['size']:
+                return
+            if size < state['size'] or self._read_fingerprint(path, state['size']) != state['fingerprint']:
+                state = None   # Rewritten: start over
+
+        if state is None:
+            with open(path, 'rb') as f:
+                header = f.readline()
+            columns = pd.read_csv(io.BytesIO(header)).columns.tolist()
+            state = {'size': len(header), 'columns': columns, 'totals': None}
+            self._files[path] = state
+        if not set(REQUIRED_COLUMNS) <= set(state['columns']):
+            state['size'] = size   # Not a codecarbon log
+            state['fingerprint'] = self._read_fingerprint(path, size)
+            return
+
+        with open(path, 'rb') as f:
+            f.seek(state['size'])
+            tail = f.read(size - state['size'])
+        # Only complete lines; a row still being written is picked up next time
+        end = tail.rfind(b'\n') + 1
+        if end:
+            rows = pd.read_csv(io.BytesIO(tail[:end]), header=None, names=state['columns'])
+            state['totals'] = merge_aggregates([state['totals'], aggregate(rows)])
+        state['size'] += end
+        state['fingerprint'] = self._read_fingerprint(path, state['size'])
+
+    def totals(self):
+        # Running totals per project, merged across files
+        self.refresh()
+        return merge_aggregates([state['totals'] for state in self._files.values()])
+
+    def summary(self):
+        totals = self.totals()
+        summary = pd.DataFrame({
+            'emissions_kg': totals['emissions'],
+            'energy_kwh': totals['energy_consumed'],
+            'cpu_power_w': totals['cpu_power'],
+            'gpu_power_w': totals['gpu_power'],
+            'ram_power_w': totals['ram_power'],
+            'run_duration_s': totals['duration'],
+            'total_duration_s': (totals['last_timestamp'] - totals['first_timestamp']).dt.total_seconds(),
+            'first_timestamp': totals['first_timestamp'],
+            'last_timestamp': totals['last_timestamp'],
+            'rows': totals['rows'],
+        })
+        summary['footprint_pct'] = summary['emissions_kg'] / 1000 / AVERAGE_FRENCH_FOOTPRINT_TONS * 100
+        return summary
+
+    def equivalences(self, summary=None):
+        # Long format: one row per (project, equivalence)
+        summary = self.summary() if summary is None else summary
+        values = equivalences(summary['emissions_kg'])
+        categories, items, units, _ = zip(*EQUIVALENCES)
+        n_projects, n_equivalences = values.shape
+        return pd.DataFrame({
+            'project_name': np.repeat(summary.index.to_numpy(), n_equivalences),
+            'category': np.tile(categories, n_projects),
+            'item': np.tile(items, n_projects),
+            'unit': np.tile(units, n_projects),
+            'value': values.ravel(),
+        })
+
+    def report(self):
+        # JSON-serializable report for the dashboard
+        summary = self.summary()
+        table = summary.reset_index()
+        for column in ['first_timestamp', 'last_timestamp']:
+            table[column] = table[column].dt.strftime('%Y-%m-%dT%H:%M:%S')
+        return {
+            'projects': table.to_dict(orient='records'),
+            'equivalences': self.equivalences(summary).to_dict(orient='records'),
+        }
+
+
+# Shared log, so successive calls only read what was appended in between
+emissions_log = EmissionsLog()
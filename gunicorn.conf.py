@@ -0,0 +1,29 @@
+import os
+import shutil
+import tempfile
+
+# Gunicorn settings for the dashboard:  gunicorn -c gunicorn.conf.py --chdir src app:server
+#
+# Every worker keeps its own Prometheus counters; with PROMETHEUS_MULTIPROC_DIR
+# set they are written to files in that directory and /metrics merges them,
+# so a scrape sees the whole server whichever worker answers it.
+
+# Threads per worker: concurrent /api/predict requests on a worker are scored
+# in one batch (see src/predict.py)
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# Set here, in the master, so workers inherit it before importing prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'sad-brain-metrics'))
+
+
+def on_starting(server):
+    # Start from an empty directory: files left by a previous run would be merged too
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    # Drop the live-only gauges of a worker that went away
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
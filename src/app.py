@@ -1,14 +1,15 @@
+import os
+import sys
 import dash 
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
-from dash_bootstrap_templates import load_figure_template
-import plotly.express as px
+import background
+import export
+import ingest
+import metrics
+import predict
 
-# Load Bootstrap themes and Plotly templates
-THEMES = ["minty", "minty_dark"]
-load_figure_template(THEMES)
-
-px.defaults.template = "minty"  # Default to light mode
+# Bootstrap themes and Plotly templates are loaded with the first figure (see themes.py)
 
 # External CSS for Bootstrap and Icons
 external_css = [
@@ -17,14 +18,34 @@ external_css = [
 ]
 
 # Init Dash app
-app = dash.Dash(__name__, title='Sad Brain Analytics App', use_pages=True, external_stylesheets=external_css, requests_pathname_prefix="/")
+# Chart callbacks run as background callbacks with BACKGROUND_CALLBACKS=1 (see background.py)
+app = dash.Dash(__name__, title='Sad Brain Analytics App', use_pages=True, external_stylesheets=external_css, requests_pathname_prefix="/",
+                background_callback_manager=background.make_manager())
 server = app.server
 
+# Local endpoint for appending new survey responses (see ingest.py)
+server.register_blueprint(ingest.blueprint)
+
+# Streaming CSV/Parquet download of the filtered rows on /export/<page> (see export.py)
+server.register_blueprint(export.blueprint)
+
+# Depression risk scoring with the trained model on /api/predict (see predict.py)
+server.register_blueprint(predict.blueprint)
+
+# Prometheus metrics on /metrics (see metrics.py and gunicorn.conf.py)
+server.register_blueprint(metrics.blueprint)
+
+# Energy and emissions per callback (see carbon_tracker.py), opt-in with CARBON_TRACKING=1
+if os.environ.get('CARBON_TRACKING'):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    import carbon_tracker
+    carbon_tracker.start_tracker()
+    carbon_tracker.track_server(server)
+
 # 🔹 Header Section
 header = html.Div([
     html.H2("Sad Brain Analytics App 🧠", className="text-dark text-center fw-bold", style={'font-size': 30}),
     html.P("Analyzing the impact of academic stress on mental health.", className="text-secondary text-center"),
-    print(dash.page_registry),
     
     # 🔹 Navigation Links (Horizontally Centered)
     html.Div([
@@ -0,0 +1,99 @@
+import functools
+import os
+import tempfile
+
+from dash import Input, Output, callback, html
+import dash_bootstrap_components as dbc
+
+import metrics
+
+# Background mode for the chart callbacks, opt-in with BACKGROUND_CALLBACKS=1.
+#
+# A chart callback then runs as a Dash background callback in its own process,
+# managed by a DiskcacheManager (results and progress go through a diskcache
+# directory shared by every gunicorn worker, no broker needed). The request
+# that starts it returns at once and the browser polls for the result, so
+# worker threads are never held by a run whose result nobody will look at:
+# when the filters change again, Dash terminates the previous run of the same
+# callback before starting the new one, and leaving the page cancels all runs.
+# While a chart is being computed its status line shows the current stage.
+#
+# Each run is a separate process, so whatever it keeps in memory (the
+# in-process figure cache, hierarchy LRU, PageStore refreshes) is gone when
+# it exits. Figures therefore go through the on-disk store shared by all
+# processes: FIGURE_CACHE_DIR, or a directory under CACHE_DIR when it is not
+# set (see figure_cache.py).
+
+ENABLED = os.environ.get('BACKGROUND_CALLBACKS', '') not in ('', '0')
+CACHE_DIR = os.environ.get('BACKGROUND_CALLBACKS_DIR') or os.path.join(tempfile.gettempdir(), 'sad-brain-callbacks')
+POLL_INTERVAL_MS = 250
+RESULT_EXPIRE_SECS = 600    # results never fetched (e.g. closed tab) are dropped after this
+
+# True in the process of a background job (a new one for every run)
+IN_JOB = False
+
+# Stages timed by metrics.stage, shown as the progress of a chart
+STAGES = {'filter': "Filtering", 'aggregate': "Aggregating", 'bootstrap': "Resampling", 'figure': "Drawing", 'serialize': "Serializing"}
+
+
+def make_manager():
+    # Background callback manager for dash.Dash(); None unless the mode is on
+    if not ENABLED:
+        return None
+    import diskcache
+    from dash import DiskcacheManager
+    return DiskcacheManager(diskcache.Cache(CACHE_DIR), expire=RESULT_EXPIRE_SECS)
+
+
+def status(graph_id):
+    # Progress of a chart's background run: hidden unless the chart is being computed
+    return html.Div([
+        html.Small(id=f'{graph_id}-progress-text', className="text-secondary"),
+        dbc.Progress(id=f'{graph_id}-progress', value=0, striped=True, animated=True, style={'height': '4px'}),
+    ], id=f'{graph_id}-status', hidden=True, style={'padding': '0 10px'})
+
+
+def _dash_callback_id(outputs):
+    # Same id Dash gives the callback, so metrics keep their labels in background mode
+    ids = [f'{output.component_id}.{output.component_property}' for output in outputs]
+    return ids[0] if len(ids) == 1 else '..' + '...'.join(ids) + '..'
+
+
+def chart_callback(graph_id, *args, **kwargs):
+    # @callback for a chart; runs in the background when the mode is on.
+    # Returns the function itself either way, so it can still be called directly.
+    def decorate(fn):
+        if not ENABLED:
+            callback(*args, **kwargs)(fn)
+            return fn
+
+        outputs = [arg for arg in args if isinstance(arg, Output)]
+        callback_id = _dash_callback_id(outputs)
+
+        @functools.wraps(fn)
+        def run(set_progress, *values):
+            global IN_JOB
+            IN_JOB = True
+            started = []
+
+            def on_stage(name):
+                # Stages nest (a figure build aggregates), so the bar moves by stages started
+                if name in STAGES:
+                    started.append(name)
+                    set_progress((f"{STAGES[name]}…", 100 * min(len(started), len(STAGES)) // (len(STAGES) + 1)))
+
+            with metrics.running_as(callback_id, on_stage):
+                return fn(*values)
+
+        callback(
+            *args,
+            background=True,
+            interval=POLL_INTERVAL_MS,
+            progress=[Output(f'{graph_id}-progress-text', 'children'), Output(f'{graph_id}-progress', 'value')],
+            progress_default=["", 0],
+            running=[(Output(f'{graph_id}-status', 'hidden'), False, True)],
+            cancel=[Input('_pages_location', 'pathname')],
+            **kwargs,
+        )(run)
+        return fn
+    return decorate
@@ -0,0 +1,166 @@
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Cohort comparison: depression rate and mean scores (Financial Stress,
+# pressure) of every cohort, i.e. every combination of values of the chosen
+# filter dimensions, with percentile bootstrap confidence intervals.
+#
+# Resampling the rows of a cohort with replacement only changes how many times
+# each distinct value is drawn, and the measures are small integer scores
+# (0/1 for depression, 1-5 for the others). So the rows are counted once per
+# cohort and combination of values (one groupby), and each bootstrap replicate of every cohort
+# is a single multinomial draw over those counts, vectorized with NumPy.
+# The bootstrap costs the same for ten thousand or ten million rows.
+#
+# Replicates are split into tasks of TASK_REPLICATES with their own seed and
+# run on a process pool of COHORT_PROCESSES processes. In the web app it
+# defaults to 1, i.e. the calling worker (every gunicorn worker would start a
+# pool of its own); the command line uses every CPU available to it. The pool
+# is never used inside a background job (see background.py), whose process
+# exits after one run. Results only depend on the seed, not on the number of
+# processes.
+#
+#   python src/cohorts.py <page csv> --by Age Gender [--metric 'Financial Stress' ...]
+
+REPLICATES = 2000
+TASK_REPLICATES = 250
+CONFIDENCE = 0.95
+MIN_COHORT_SIZE = 20           # smaller cohorts are left out of the ranking
+SEED = 0
+PROCESSES = int(os.environ.get('COHORT_PROCESSES') or 1)
+POOL_MIN_DRAWS = 200_000       # below this many cohort replicates the pool start costs more than it saves
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def value_counts(df, dims, columns):
+    # column -> cohorts (rows, indexed by dims) x distinct values of the column -> number of rows.
+    # One pass over the rows; the per-column tables are rolled up from its (small) result.
+    joint = df.groupby(list(dims) + list(columns), observed=True).size()
+    tables = {}
+    for column in columns:
+        counts = joint.groupby(level=list(dims) + [column], observed=True).sum()
+        tables[column] = counts.unstack(column, fill_value=0) if dims else counts.to_frame('All').T
+    return tables
+
+
+def bootstrap_means(tables, replicates, seed):
+    # tables: [(counts (cohorts x values), values)] per measure, the same cohorts in each.
+    # Returns the means of `replicates` resamples of every cohort: (replicates, measures, cohorts)
+    rng = np.random.default_rng(seed)
+    means = np.empty((replicates, len(tables), len(tables[0][0])))
+    for m, (counts, values) in enumerate(tables):
+        n = counts.sum(axis=1)
+        draws = rng.multinomial(n, counts / n[:, None], size=(replicates, len(n)))
+        means[:, m] = draws @ values / n
+    return means
+
+
+def available_cpus():
+    # CPUs this process may run on, capped by the cgroup (v2) CPU quota of a container
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(int(quota) // int(period), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the gunicorn workers run threads, which fork does not mix well with
+            _pool = ProcessPoolExecutor(PROCESSES, mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(_shutdown)
+    return _pool
+
+
+def _shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _in_background_job():
+    # Not imported unless the app is running: the command line does not need Dash
+    background = sys.modules.get('background')
+    return background is not None and background.IN_JOB
+
+
+def bootstrap(tables, replicates=REPLICATES, seed=SEED):
+    seeds = np.random.SeedSequence(seed).spawn(-(-replicates // TASK_REPLICATES))
+    sizes = [min(TASK_REPLICATES, replicates - i * TASK_REPLICATES) for i in range(len(seeds))]
+    if (PROCESSES > 1 and len(seeds) > 1 and replicates * len(tables[0][0]) >= POOL_MIN_DRAWS
+            and not _in_background_job()):
+        parts = _executor().map(bootstrap_means, [tables] * len(seeds), sizes, seeds)
+    else:
+        parts = map(bootstrap_means, [tables] * len(seeds), sizes, seeds)
+    return np.concatenate(list(parts))
+
+
+def compare(df, dims, measures, replicates=REPLICATES, confidence=CONFIDENCE, min_size=MIN_COHORT_SIZE, seed=SEED):
+    # measures: {label: column}. One row per cohort of at least `min_size` rows with
+    # its size, the mean of each measure and its confidence interval ('<label> low',
+    # '<label> high'), ranked by the first measure (highest first).
+    from metrics import stage   # Not at module level: the pool processes only need NumPy
+
+    with stage('aggregate'):
+        counts = value_counts(df, dims, list(dict.fromkeys(measures.values())))
+        sizes = next(iter(counts.values())).sum(axis=1)
+        cohorts = sizes.index[sizes >= min_size]
+        tables = [(counts[column].loc[cohorts].to_numpy(np.int64), counts[column].columns.to_numpy(np.float64))
+                  for column in measures.values()]
+
+    ranking = cohorts.to_frame(index=False) if dims else pd.DataFrame(index=range(len(cohorts)))
+    ranking['count'] = sizes.loc[cohorts].to_numpy()
+    if ranking.empty:
+        low = high = np.empty((len(measures), 0))
+    else:
+        with stage('bootstrap'):
+            means = bootstrap(tables, replicates, seed)
+            low, high = np.percentile(means, [50 * (1 - confidence), 50 * (1 + confidence)], axis=0)
+
+    for m, label in enumerate(measures):
+        table, values = tables[m]
+        ranking[label] = table @ values / ranking['count'].to_numpy()
+        ranking[f'{label} low'] = low[m]
+        ranking[f'{label} high'] = high[m]
+    return ranking.sort_values(next(iter(measures)), ascending=False, ignore_index=True)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from dataset_store import read_dataset
+    import schema
+
+    parser = argparse.ArgumentParser(description='Rank the cohorts of a page dataset with bootstrap confidence intervals.')
+    parser.add_argument('path')
+    parser.add_argument('--by', nargs='*', default=['Age', 'Gender'])
+    parser.add_argument('--metric', nargs='*', default=['Financial Stress'], help='score columns besides the depression rate')
+    parser.add_argument('--replicates', type=int, default=REPLICATES)
+    parser.add_argument('--processes', type=int, default=int(os.environ.get('COHORT_PROCESSES') or available_cpus()))
+    args = parser.parse_args()
+    PROCESSES = args.processes
+
+    df = schema.enforce(read_dataset(args.path))
+    start = time.perf_counter()
+    ranking = compare(df, args.by, {'Depression rate': 'Depression_numeric', **{metric: metric for metric in args.metric}}, args.replicates)
+    pd.set_option('display.width', 200)
+    print(ranking.to_string())
+    print(f'{len(df):,} rows, {len(ranking)} cohorts, {args.replicates} replicates: {time.perf_counter() - start:.2f}s', file=sys.stderr)
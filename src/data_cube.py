@@ -0,0 +1,66 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from filter_index import FilterIndex
+from metrics import stage
+
+
+class DataCube:
+    # Pre-aggregated view of a page dataset: one cell per combination of `dims`
+    # holding count, sum and sum-of-squares of each measure. Charts roll up the
+    # cells matching the current filters instead of regrouping the raw rows,
+    # so callback cost depends on the number of cells, not the number of rows.
+
+    def __init__(self, df, dims, measures):
+        self.dims = list(dims)
+        self.measures = list(measures)
+        self.stat_columns = ['count']
+        for measure in self.measures:
+            self.stat_columns += [f'{measure}_sum', f'{measure}_sumsq']
+        self.build(df)
+
+    def build(self, df):
+        values = df[self.dims].copy()
+        values['count'] = 1
+        for measure in self.measures:
+            # Summed in int64/float64: the int8/float32 columns of the schema would overflow or lose precision
+            column = df[measure].astype(np.result_type(df[measure].dtype, np.int64))
+            values[f'{measure}_sum'] = column
+            values[f'{measure}_sumsq'] = column ** 2
+
+        self._set_cells(values.groupby(self.dims, observed=True, sort=False).sum().reset_index())
+
+    def _set_cells(self, cells):
+        self.cells = cells
+        self.index = FilterIndex(cells, self.dims)
+
+    def extended(self, delta):
+        # New cube with the rows of `delta` added: only the delta is aggregated,
+        # then its cells are merged into the existing ones
+        added = DataCube(delta, self.dims, self.measures)
+        # Bring the existing cells to the delta's dtypes (categories may have grown)
+        cells = self.cells.astype({dim: added.cells[dim].dtype for dim in self.dims})
+
+        cube = copy.copy(self)
+        cube._set_cells(pd.concat([cells, added.cells], ignore_index=True)
+                        .groupby(self.dims, observed=True, sort=False).sum().reset_index())
+        return cube
+
+    def rollup(self, by=(), filters=None):
+        # Sum the matching cells over `by` (all of them when `by` is empty)
+        with stage('filter'):
+            cells = self.index.filter(self.cells, filters or {})
+
+        with stage('aggregate'):
+            if by:
+                rolled = cells.groupby(list(by), observed=True)[self.stat_columns].sum().reset_index()
+            else:
+                rolled = cells[self.stat_columns].sum().to_frame().T
+
+            for measure in self.measures:
+                mean = rolled[f'{measure}_sum'] / rolled['count']
+                rolled[f'{measure}_mean'] = mean
+                rolled[f'{measure}_var'] = rolled[f'{measure}_sumsq'] / rolled['count'] - mean ** 2
+        return rolled
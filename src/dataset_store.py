@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import schema
+
+# Columnar binary copy of the page CSVs: one .npy file per column (text columns
+# as integer category codes) plus a meta.json. Every gunicorn worker memory-maps
+# the same read-only files, so the page data lives once in the OS page cache
+# instead of once per worker, and booting a worker no longer parses the CSV.
+# Columns are stored with the types of schema.py (categories in schema order,
+# int8/float32 numerics), so loading them needs no conversion.
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets')
+DATASETS = ['df_students.csv', 'df_work_professionals.csv']
+
+
+def store_path(csv_path, store_dir=None):
+    # One directory per CSV version, so a changed CSV never reuses a stale store
+    stat = os.stat(csv_path)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    store_dir = store_dir or os.environ.get('DATASET_STORE_DIR') or os.path.join(os.path.dirname(csv_path), '.store')
+    return os.path.join(store_dir, f'{name}-{stat.st_mtime_ns}-{stat.st_size}')
+
+
+def _code_dtype(n_categories):
+    # Smallest signed type that holds the codes (-1 marks missing values)
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def convert(csv_path, path, chunksize=500_000):
+    # Streams the CSV twice in chunks so datasets larger than memory convert too:
+    # pass 1 counts rows and collects the categories of text columns, pass 2
+    # writes every chunk into preallocated memory-mapped .npy files.
+    n_rows = 0
+    text_columns, numeric_dtypes, typed = {}, {}, {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        n_rows += len(chunk)
+        for column in chunk.columns:
+            if chunk[column].dtype == object or column in text_columns:
+                text_columns.setdefault(column, set()).update(chunk[column].dropna().unique())
+            else:
+                numeric_dtypes[column] = np.result_type(numeric_dtypes.get(column, chunk[column].dtype), chunk[column].dtype)
+                if column in schema.NUMERIC:
+                    typed[column] = typed.get(column, True) and schema.fits(column, chunk[column])
+    # Schema types where the values allow (anything else is kept as read and rejected at load)
+    for column, fits in typed.items():
+        if fits:
+            numeric_dtypes[column] = np.dtype(schema.NUMERIC[column])
+    columns = list(chunk.columns) if n_rows else list(pd.read_csv(csv_path, nrows=0).columns)
+
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+
+    # Write into a temporary directory and rename it into place, so workers
+    # converting at the same time never see a half-written store
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    meta_columns, arrays = [], {}
+    for i, column in enumerate(columns):
+        file_path = os.path.join(tmp, f'{i}.npy')
+        if column in text_columns:
+            known = schema.CLOSED.get(column, [])
+            categories = list(known) + sorted(text_columns[column] - set(known))
+            ordered = column in schema.ORDERED
+            arrays[column] = (np.lib.format.open_memmap(file_path, mode='w+', dtype=_code_dtype(len(categories)), shape=(n_rows,)),
+                              pd.CategoricalDtype(categories))
+            meta_columns.append({'name': column, 'categories': categories, 'ordered': ordered})
+        else:
+            arrays[column] = (np.lib.format.open_memmap(file_path, mode='w+', dtype=numeric_dtypes.get(column, np.float64), shape=(n_rows,)), None)
+            meta_columns.append({'name': column})
+
+    start = 0
+    text_dtypes = {column: object for column in text_columns}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=text_dtypes):
+        end = start + len(chunk)
+        for column, (array, categorical) in arrays.items():
+            if categorical is not None:
+                array[start:end] = pd.Categorical(chunk[column], dtype=categorical).codes
+            else:
+                array[start:end] = chunk[column].to_numpy()
+        start = end
+    for array, _ in arrays.values():
+        array.flush()
+    del arrays
+
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({'source': os.path.basename(csv_path), 'rows': n_rows, 'columns': meta_columns}, f)
+
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # Another worker finished the same conversion first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def open_dataset(path):
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+
+    data = {}
+    for i, column in enumerate(meta['columns']):
+        values = np.load(os.path.join(path, f'{i}.npy'), mmap_mode='r')
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(values, column['categories'], ordered=column.get('ordered', False))
+        data[column['name']] = values
+    # copy=False keeps every column backed by its read-only memory map
+    return pd.DataFrame(data, copy=False)
+
+
+def remove_stale(path):
+    # Drop stores of older versions of the same CSV (mapped files stay valid until unmapped)
+    parent, current = os.path.split(path)
+    name = current.rsplit('-', 2)[0]
+    for entry in os.listdir(parent):
+        if entry != current and entry.rsplit('-', 2)[0] == name:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def read_dataset(csv_path, store_dir=None):
+    # Memory-mapped DataFrame for csv_path, converting the CSV on first use
+    path = store_path(csv_path, store_dir)
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        convert(csv_path, path)
+        remove_stale(path)
+    return open_dataset(path)
+
+
+if __name__ == '__main__':
+    # Convert ahead of time (e.g. in the deploy build) so workers only map files:
+    #   python src/dataset_store.py [csv ...]
+    for csv_path in sys.argv[1:] or [os.path.join(ASSETS_DIR, name) for name in DATASETS]:
+        path = store_path(csv_path)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            convert(csv_path, path)
+            remove_stale(path)
+        print(f'{csv_path} -> {path}')
@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import features
+from predict import MODEL_FILE, scores
+
+# Check that the features the app scores with are the notebook's features.
+#
+# Runs the notebook's own cleaning and "Model Training" preprocessing cells
+# (read from sadbrainanalytics.ipynb, not copied) on the raw survey and
+# compares the result with features.SurveyEncoder, column by column. With a
+# trained model it also compares the served model's probabilities on both.
+# Exits with status 1 on any difference, so it can gate a build:
+#
+#   python src/encoding_parity.py [--model models/depression_model.joblib]
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+NOTEBOOK = os.path.join(ROOT_DIR, 'sadbrainanalytics.ipynb')
+RAW_DATASET = os.path.join(ROOT_DIR, 'dataset', 'final_depression_dataset_1.csv')
+
+# Notebook cells that change `df` before training, found by their first statement
+CLEANING_CELLS = [
+    "df = df.drop('Name', axis=1)",
+    "def calculate_memory(df):",
+    "df['Profession'] = df['Profession'].fillna('Uknown')",
+    "initial_memory = calculate_memory(df)",
+]
+# Every code cell from the first to the last of these is training preprocessing
+TRAINING_START = "df_for_training = df.copy()"
+TRAINING_END = "df_for_training.drop(columns= 'CGPA', inplace=True)"
+
+
+def notebook_cells(path=NOTEBOOK):
+    with open(path, encoding='utf-8') as f:
+        cells = json.load(f)['cells']
+    sources = [''.join(cell['source']) for cell in cells if cell['cell_type'] == 'code']
+
+    def find(statement):
+        matches = [i for i, source in enumerate(sources) if statement in source]
+        if not matches:
+            raise LookupError(f'notebook cell not found: {statement!r}')
+        return matches[0]
+
+    cleaning = [sources[find(statement)] for statement in CLEANING_CELLS]
+    training = sources[find(TRAINING_START):find(TRAINING_END) + 1]
+    return cleaning + training
+
+
+def notebook_features(raw, path=NOTEBOOK):
+    # The notebook's df_for_training for the raw survey
+    namespace = {'pd': pd, 'np': np, 'df': raw.copy(), 'print': lambda *args, **kwargs: None}
+    for source in notebook_cells(path):
+        exec(source, namespace)
+    return namespace['df_for_training']
+
+
+def compare(expected, actual):
+    # Differences between two feature frames, as messages
+    if list(expected.columns) != list(actual.columns):
+        return [f'columns differ: notebook {list(expected.columns)} vs app {list(actual.columns)}']
+    problems = []
+    for column in expected.columns:
+        left = expected[column].to_numpy(dtype=float)
+        right = actual[column].to_numpy(dtype=float)
+        mismatched = ~np.isclose(left, right, rtol=0, atol=1e-12, equal_nan=True)
+        if mismatched.any():
+            i = np.flatnonzero(mismatched)[0]
+            problems.append(f'{column}: {mismatched.sum()} rows differ (row {i}: notebook {left[i]} vs app {right[i]})')
+    return problems
+
+
+def check(raw_path=RAW_DATASET, model_path=MODEL_FILE, notebook_path=NOTEBOOK):
+    raw = pd.read_csv(raw_path)
+    expected = notebook_features(raw, notebook_path)
+    X_expected = expected.drop(columns=[features.TARGET])
+
+    survey = features.clean(raw)
+    problems = compare(X_expected, features.SurveyEncoder().fit(survey).transform(survey))
+    if not (features.target(survey).to_numpy() == expected[features.TARGET].to_numpy()).all():
+        problems.append('target differs')
+
+    if model_path and os.path.exists(model_path):
+        import joblib
+        model = joblib.load(model_path)['model']
+        # The served pipeline on raw rows vs its classifier on the notebook's features
+        served = scores(model, survey)
+        reference = scores(model.named_steps['classifier'], X_expected)
+        if not np.allclose(served, reference, rtol=0, atol=1e-12):
+            problems.append(f'model probabilities differ by up to {np.abs(served - reference).max()}')
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the app's feature encoding against the notebook.")
+    parser.add_argument('--input', default=RAW_DATASET)
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--notebook', default=NOTEBOOK)
+    args = parser.parse_args()
+
+    problems = check(args.input, args.model, args.notebook)
+    for problem in problems:
+        print(problem)
+    print('encoding differs from the notebook' if problems else 'encoding matches the notebook')
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,114 @@
+import importlib.util
+from urllib.parse import quote, urlencode
+
+from flask import Blueprint, Response, jsonify, request
+
+# Download of the rows behind the charts: GET /export/<page>.csv or
+# /export/<page>.parquet, with the page filters as query parameters named after
+# their columns (e.g. ?Age=25-34&City=Pune, as built by url()). The matching
+# rows are selected with the page's filter index and streamed in chunks of
+# CHUNK_ROWS, so only one chunk is ever converted and held in memory, and none
+# of it goes through a Dash callback. The export reads one PageData snapshot:
+# rows appended while it streams are not mixed in.
+#
+# Parquet needs pyarrow (optional): without it only CSV is offered.
+
+blueprint = Blueprint('export', __name__)
+
+# page name -> PageStore
+pages = {}
+
+CHUNK_ROWS = 50_000
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+
+def register(page, store):
+    pages[page] = store
+
+
+def url(page, fmt, filters):
+    # Export link for the rows of `page` matching `filters` (None values are no filter)
+    query = urlencode({column: value for column, value in filters.items() if value is not None}, quote_via=quote)
+    return f'/export/{page}.{fmt}' + (f'?{query}' if query else '')
+
+
+def chunks(df, rows):
+    # Consecutive slices of df, restricted to the row positions `rows` (all rows when None)
+    n_rows = len(df) if rows is None else len(rows)
+    for start in range(0, n_rows, CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS] if rows is None else df.take(rows[start:start + CHUNK_ROWS])
+
+
+def csv_stream(df, rows):
+    yield df.head(0).to_csv(index=False).encode()
+    for chunk in chunks(df, rows):
+        yield chunk.to_csv(header=False, index=False).encode()
+
+
+class _Sink:
+    # Write-only file for ParquetWriter that keeps the bytes written until drained
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def parquet_stream(df, rows):
+    # One row group per chunk, sent as soon as it is written
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Categoricals become dictionary columns with every category, so all chunks share the schema
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in chunks(df, rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False), row_group_size=CHUNK_ROWS)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+@blueprint.route('/export/<page>.<fmt>')
+def export(page, fmt):
+    if page not in pages:
+        return jsonify({'error': f'unknown page {page!r}', 'pages': sorted(pages)}), 404
+    if fmt not in FORMATS:
+        return jsonify({'error': f'unknown format {fmt!r}', 'formats': sorted(FORMATS)}), 404
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        return jsonify({'error': 'Parquet export needs pyarrow, which is not installed'}), 501
+
+    store = pages[page]
+    unknown = [column for column in request.args if column not in store.index_columns]
+    if unknown:
+        return jsonify({'error': 'unknown filter columns', 'columns': unknown, 'filters': store.index_columns}), 400
+
+    data = store.get()
+    rows = data.filter_index.select(request.args.to_dict())
+    stream = csv_stream if fmt == 'csv' else parquet_stream
+    return Response(stream(data.df, rows), mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{page}.{fmt}"'})
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# Model features of the "Model Training" section of sadbrainanalytics.ipynb as
+# a fitted scikit-learn transformer, so training and serving encode a survey
+# response the same way. The output columns (names, order and values) are the
+# notebook's df_for_training without the target.
+
+TARGET = 'Depression_Yes'
+
+# One-hot encoded with drop_first, in the notebook's order
+DUMMY_COLUMNS = [
+    'Gender', 'Profession', 'Working Professional or Student',
+    'Have you ever had suicidal thoughts ?', 'Family History of Mental Illness',
+]
+
+DIET_MAPPING = {'Unhealthy': 0, 'Moderate': 1, 'Healthy': 2}
+
+# Cities ranked by population (smallest first)
+CITY_POPULATION = {
+    'Srinagar': 1, 'Meerut': 2, 'Rajkot': 3, 'Vadodara': 4, 'Varanasi': 5,
+    'Faridabad': 6, 'Ludhiana': 7, 'Patna': 8, 'Lucknow': 9, 'Kanpur': 10,
+    'Indore': 11, 'Bhopal': 12, 'Agra': 13, 'Thane': 14, 'Kalyan': 15,
+    'Nashik': 16, 'Nagpur': 17, 'Surat': 18, 'Ahmedabad': 19, 'Delhi': 20,
+    'Jaipur': 21, 'Hyderabad': 22, 'Chennai': 23, 'Kolkata': 24, 'Pune': 25,
+    'Visakhapatnam': 26, 'Vasai-Virar': 27, 'Ghaziabad': 28, 'Mumbai': 29,
+    'Bangalore': 30
+}
+
+SLEEP_MAPPING = {
+    'Less than 5 hours': 0,  # Worst
+    '5-6 hours': 1,
+    '7-8 hours': 2,  # Ideal Sleep
+    'More than 8 hours': 3  # Excessive Sleep
+}
+
+# Degree -> ordinal category (unknown degrees stay missing, as in the notebook)
+DEGREE_LEVELS = {
+    0: ['Class 12'],  # High School
+    1: ['BA', 'B.Com', 'BCA', 'BSc', 'BBA', 'BHM', 'B.Tech', 'BE', 'B.Arch', 'B.Pharm', 'B.Ed'],  # Undergraduate
+    2: ['ME', 'MA', 'M.Com', 'MCA', 'MSc', 'M.Ed', 'MBA', 'M.Pharm', 'MHM', 'M.Tech', 'LLM'],  # Master's Level
+    3: ['MD', 'MBBS', 'LLB'],  # Professional Degree
+    4: ['PhD'],  # Doctoral Degree
+}
+DEGREE_CATEGORY = {degree: level for level, degrees in DEGREE_LEVELS.items() for degree in degrees}
+
+# Columns kept as they are
+NUMERIC_COLUMNS = ['Work/Study Hours', 'Financial Stress']
+
+# Survey columns the encoder reads. The optional ones only apply to students or
+# to professionals and are filled like the notebook does when missing.
+REQUIRED_COLUMNS = [
+    'Gender', 'Age', 'City', 'Working Professional or Student', 'Sleep Duration', 'Dietary Habits', 'Degree',
+    'Have you ever had suicidal thoughts ?', 'Work/Study Hours', 'Financial Stress', 'Family History of Mental Illness',
+]
+OPTIONAL_COLUMNS = ['Profession', 'Academic Pressure', 'Work Pressure', 'Study Satisfaction', 'Job Satisfaction']
+
+
+def clean(df):
+    # The notebook's cleaning of the raw survey ("Data Cleaning" section)
+    df = df.drop(columns=['Name'], errors='ignore')
+    df['Profession'] = df['Profession'].fillna('Uknown')
+    df['Work Pressure'] = df['Work Pressure'].fillna(0).round().astype('int8')
+    df['Job Satisfaction'] = df['Job Satisfaction'].fillna(0).round().astype('int8')
+    return df
+
+
+def target(df):
+    return (df['Depression'] == 'Yes').rename(TARGET)
+
+
+class SurveyEncoder(BaseEstimator, TransformerMixin):
+    # Cleaned survey rows -> notebook model features. fit() learns what the
+    # notebook derived from the whole dataset: the dummy categories and the
+    # Age standardization.
+
+    def fit(self, X, y=None):
+        self.categories_ = {column: sorted(X[column].dropna().unique()) for column in DUMMY_COLUMNS}
+        age = X['Age'].to_numpy(dtype=float)
+        self.age_mean_ = age.mean()
+        self.age_scale_ = age.std() or 1.0   # StandardScaler: population std, 1 when constant
+        self.feature_names_ = (
+            ['Age', 'City', 'Dietary Habits'] + NUMERIC_COLUMNS
+            + [f'{column}_{value}' for column in DUMMY_COLUMNS for value in self.categories_[column][1:]]
+            + ['Sleep_Duration_Encoded', 'Degree_Category', 'Total_Pressure', 'Total_Satisfaction']
+        )
+        return self
+
+    def transform(self, X):
+        features = {
+            'Age': (X['Age'].to_numpy(dtype=float) - self.age_mean_) / self.age_scale_,
+            'City': X['City'].map(CITY_POPULATION),
+            'Dietary Habits': X['Dietary Habits'].map(DIET_MAPPING),
+        }
+        for column in NUMERIC_COLUMNS:
+            features[column] = X[column]
+        for column in DUMMY_COLUMNS:
+            values = X[column].to_numpy()
+            for value in self.categories_[column][1:]:
+                features[f'{column}_{value}'] = values == value
+        features['Sleep_Duration_Encoded'] = X['Sleep Duration'].map(SLEEP_MAPPING)
+        features['Degree_Category'] = X['Degree'].map(DEGREE_CATEGORY)
+        features['Total_Pressure'] = X['Academic Pressure'].fillna(0) + X['Work Pressure']
+        features['Total_Satisfaction'] = X['Study Satisfaction'].fillna(0) + X['Job Satisfaction']
+        return pd.DataFrame(features, index=X.index)[self.feature_names_]
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(self.feature_names_, dtype=object)
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import background
+from metrics import stage
+
+# Where src/prebuild_figures.py writes the default views at deploy time
+PREBUILT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', '.figures')
+
+
+class SharedFigureStore:
+    # On-disk figure store (SQLite) that every gunicorn worker on the host can
+    # read and write, so a view rendered by one worker is a hit for the others.
+    # Bounded by total payload size; the least recently used rows go first.
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS figures ('
+                'key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT payload FROM figures WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE figures SET last_used = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def put(self, key, payload):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO figures VALUES (?, ?, ?, ?)',
+                (key, payload, len(payload), time.time())
+            )
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM figures').fetchone()[0]
+            if total > self.max_bytes:
+                # Drop the oldest rows until we are back under the bound
+                conn.execute(
+                    'DELETE FROM figures WHERE key IN ('
+                    ' SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS running FROM figures)'
+                    ' WHERE running > ?)',
+                    (self.max_bytes,)
+                )
+
+
+class PrebuiltFigures:
+    # Read-only directory of figures rendered at deploy time by
+    # src/prebuild_figures.py, one JSON file per cache key. Keys carry the data
+    # version, so figures of an older CSV are never served, they just stop matching.
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, entries):
+        # Replace the directory with the given (key, payload) pairs; written
+        # aside and renamed into place, like the dataset store
+        parent = os.path.dirname(os.path.abspath(self.directory))
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+        for key, payload in entries:
+            with open(os.path.join(tmp, os.path.basename(self._path(key))), 'w', encoding='utf-8') as f:
+                f.write(payload)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.rename(tmp, self.directory)
+
+
+class FigureCache:
+    # LRU cache of serialized figures, bounded by the total size of the cached
+    # JSON. Keys identify a view: page, chart, data version and filter state.
+    # Behind the in-process LRU sit the figures prebuilt at deploy time and an
+    # optional SharedFigureStore, in that order.
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, shared=None, prebuilt=None):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.prebuilt = prebuilt
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.prebuilt_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        # FIGURE_CACHE_MB bounds the in-process cache; FIGURE_CACHE_DIR turns on
+        # the on-disk store shared by all workers (bounded by FIGURE_CACHE_SHARED_MB).
+        # Prebuilt figures are read from FIGURE_PREBUILT_DIR (empty: none)
+        max_bytes = int(float(os.environ.get('FIGURE_CACHE_MB', 64)) * 1024 * 1024)
+        shared = None
+        cache_dir = os.environ.get('FIGURE_CACHE_DIR')
+        if not cache_dir and background.ENABLED:
+            # Background jobs run in processes of their own: what they put in the
+            # in-process cache is lost when they exit, so they need the shared store
+            cache_dir = os.path.join(background.CACHE_DIR, 'figures')
+        if cache_dir:
+            shared_bytes = int(float(os.environ.get('FIGURE_CACHE_SHARED_MB', 256)) * 1024 * 1024)
+            shared = SharedFigureStore(os.path.join(cache_dir, 'figures.sqlite'), shared_bytes)
+        prebuilt_dir = os.environ.get('FIGURE_PREBUILT_DIR', PREBUILT_DIR)
+        return cls(max_bytes, shared, PrebuiltFigures(prebuilt_dir) if prebuilt_dir else None)
+
+    @staticmethod
+    def make_key(page, chart, version, filters=None):
+        # Filters are normalized so that None, '' and missing keys are the same view
+        state = sorted((column, value) for column, value in (filters or {}).items() if value not in (None, ''))
+        return json.dumps([page, chart, version, state])
+
+    def get(self, key):
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+
+        if self.prebuilt is not None:
+            payload = self.prebuilt.get(key)
+            if payload is not None:
+                with self._lock:
+                    self.prebuilt_hits += 1
+                self._store(key, payload)
+                return payload
+
+        if self.shared is not None:
+            payload = self.shared.get(key)
+            if payload is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self._store(key, payload)
+                return payload
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, payload):
+        self._store(key, payload)
+        if self.shared is not None:
+            self.shared.put(key, payload)
+
+    def _store(self, key, payload):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = payload
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_build(self, key, build):
+        # Return the figure for `key` as a plain dict, building it on a miss
+        payload = self.get(key)
+        if payload is None:
+            with stage('figure'):
+                fig = build()
+            with stage('serialize'):
+                payload = fig.to_json()
+            self.put(key, payload)
+        return json.loads(payload)
+
+    def entries(self):
+        # (key, payload) pairs held in process, least recently used first
+        with self._lock:
+            return list(self._entries.items())
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'prebuilt_hits': self.prebuilt_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# One cache for the whole app, shared by every page
+figure_cache = FigureCache.from_env()
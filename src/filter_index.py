@@ -0,0 +1,67 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+class FilterIndex:
+    # Bitmap index over a few low-cardinality columns, built once at load time.
+    # Each value of each column gets a packed bitmap (1 bit per row), so any
+    # combination of dropdown filters is a bitwise AND instead of a chain of
+    # boolean masks that each copy the surviving rows.
+
+    def __init__(self, df, columns):
+        self.columns = list(columns)
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        for column in self.columns:
+            codes, values = pd.factorize(df[column], sort=False)
+            self.bitmaps[column] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(values)
+            }
+
+    def extended(self, delta):
+        # New index covering the current rows followed by the rows of `delta`.
+        # Only the last partially filled byte of each bitmap is repacked.
+        index = copy.copy(self)
+        index.n_rows = self.n_rows + len(delta)
+        index.bitmaps = {}
+
+        full_bytes, tail_bits = divmod(self.n_rows, 8)
+        for column in self.columns:
+            codes, values = pd.factorize(delta[column], sort=False)
+            new_codes = dict(zip(values, range(len(values))))
+            bitmaps = {}
+            for value in list(self.bitmaps[column]) + [v for v in values if v not in self.bitmaps[column]]:
+                old = self.bitmaps[column].get(value)
+                if old is None:
+                    old = np.zeros(full_bytes + (tail_bits > 0), dtype=np.uint8)
+                added = codes == new_codes[value] if value in new_codes else np.zeros(len(delta), dtype=bool)
+                tail = np.unpackbits(old[full_bytes:], count=tail_bits).astype(bool)
+                bitmaps[value] = np.concatenate([old[:full_bytes], np.packbits(np.concatenate([tail, added]))])
+            index.bitmaps[column] = bitmaps
+        return index
+
+    def select(self, filters):
+        # filters: {column: value}; None/empty values mean "no filter"
+        selected = None
+        for column, value in filters.items():
+            if value is None or value == '':
+                continue
+            bitmap = self.bitmaps[column].get(value)
+            if bitmap is None:
+                # Unknown value: nothing matches
+                return np.empty(0, dtype=np.intp)
+            selected = bitmap if selected is None else np.bitwise_and(selected, bitmap)
+
+        if selected is None:
+            return None
+        return np.flatnonzero(np.unpackbits(selected, count=self.n_rows))
+
+    def filter(self, df, filters):
+        # Return the rows of df (the frame the index was built on) matching filters
+        rows = self.select(filters)
+        if rows is None:
+            return df
+        return df.take(rows)
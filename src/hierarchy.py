@@ -0,0 +1,111 @@
+import functools
+import json
+
+import pandas as pd
+
+# Sunburst data as a precomputed tree. Every node of a path of dimensions
+# (e.g. Pressure Level -> Sleep Duration -> City -> Dietary Habits) holds its
+# count, the sums of the cube measures and rates derived from them. Charts
+# draw a subtree of limited depth around the node the user drilled into, so
+# the figure carries two rings instead of the whole tree.
+
+SEPARATOR = '/'
+
+
+class Hierarchy:
+
+    def __init__(self, leaves, path, measures):
+        # leaves: one row per combination of `path` with count and {measure}_sum columns
+        self.path = list(path)
+        stats = ['count'] + [f'{measure}_sum' for measure in measures]
+
+        levels = []
+        for depth in range(1, len(self.path) + 1):
+            level = leaves.groupby(self.path[:depth], observed=True)[stats].sum().reset_index()
+            level['depth'] = depth
+            levels.append(level)
+        nodes = pd.concat(levels, ignore_index=True)
+
+        # Node ids are the labels of the path down to the node, e.g. 'High/7-8 hours/Delhi'
+        components = [nodes[column].astype(object).astype(str) for column in self.path]
+        ids = components[0]
+        parents = pd.Series('', index=nodes.index)
+        for depth in range(2, len(self.path) + 1):
+            parents = parents.where(nodes['depth'] != depth, ids)
+            ids = ids.where(nodes['depth'] < depth, ids + SEPARATOR + components[depth - 1])
+        nodes['id'] = ids
+        nodes['parent'] = parents
+        nodes['label'] = ids.str.rsplit(SEPARATOR, n=1).str[-1]
+
+        for measure in measures:
+            nodes[f'{measure}_rate'] = nodes[f'{measure}_sum'] / nodes['count']
+        parent_count = nodes['parent'].map(nodes.set_index('id')['count'])
+        nodes['share'] = nodes['count'] / parent_count.fillna(nodes.loc[nodes['depth'] == 1, 'count'].sum())
+
+        self.nodes = nodes.drop(columns=self.path).set_index('id', drop=False)
+
+    @classmethod
+    def from_cube(cls, cube, path, filters=None):
+        return cls(cube.rollup(path, filters), path, cube.measures)
+
+    def depth_of(self, node):
+        return 0 if node == '' else int(self.nodes.at[node, 'depth'])
+
+    def subtree(self, root='', depth=2):
+        # The root (unless it is the top) and its descendants down to `depth` levels below it
+        nodes = self.nodes
+        root_depth = self.depth_of(root)
+        mask = (nodes['depth'] > root_depth) & (nodes['depth'] <= root_depth + depth)
+        if root:
+            mask &= nodes['id'].str.startswith(root + SEPARATOR).to_numpy()
+            mask |= (nodes['id'] == root).to_numpy()
+        subtree = nodes[mask].copy()
+        if root:
+            subtree.loc[root, 'parent'] = ''   # Drawn as the center of the sunburst
+        return subtree
+
+    def next_root(self, root, clicked):
+        # Node to draw around after a click on node `clicked`: a click on the
+        # center goes one level up, a click on a node with children drills in
+        if clicked not in self.nodes.index and clicked != '':
+            return ''
+        if clicked == root:
+            return '' if root == '' else self.nodes.at[root, 'parent']
+        if self.depth_of(clicked) < len(self.path):
+            return clicked
+        return root
+
+
+@functools.lru_cache(maxsize=64)
+def _cached(cube, path, filters):
+    return Hierarchy.from_cube(cube, list(path), dict(filters))
+
+
+def hierarchy(cube, path, filters):
+    # Tree for a cube and filter state, built once and reused for every drill-down
+    return _cached(cube, tuple(path), tuple(sorted((k, v) for k, v in filters.items() if v not in (None, ''))))
+
+
+def root_state(filters):
+    # Identifies the filter state a drill-down root belongs to (kept next to the root in a dcc.Store)
+    return json.dumps({k: v for k, v in filters.items() if v not in (None, '')}, sort_keys=True, default=str)
+
+
+def clicked_id(click_data):
+    if click_data and click_data.get('points'):
+        point = click_data['points'][0]
+        return point.get('id', point.get('label', ''))
+    return None
+
+
+def drill(tree, state, filters, click_data):
+    # New {'root', 'filters'} store value: back to the top when the filters
+    # changed, otherwise follow the click on the sunburst (if any). `tree`
+    # returns the Hierarchy; it is only built when there is a click to follow.
+    state = state or {}
+    key = root_state(filters)
+    root = state.get('root', '') if state.get('filters') == key else ''
+    clicked = clicked_id(click_data)
+    if clicked is not None and state.get('filters') == key:
+        root = tree().next_root(root, clicked)
+    return {'root': root, 'filters': key}
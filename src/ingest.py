@@ -0,0 +1,108 @@
+import io
+import ipaddress
+import os
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, jsonify, request
+from pandas.api.types import is_integer_dtype, is_numeric_dtype
+
+import pipeline
+import schema
+from page_store import csv_lock
+
+# Append path for new survey responses: POST /ingest/<page> with a JSON list of
+# records or a CSV body (with header). Rows are validated against the page
+# dataset, completed with the derived page columns and appended to the page CSV.
+# Every worker's PageStore then picks up only the appended rows.
+#
+# Only local clients may post, unless the request carries the INGEST_TOKEN
+# environment value in an X-Ingest-Token header.
+
+blueprint = Blueprint('ingest', __name__)
+
+# page name -> (store, role, pressure column, pressure level bounds)
+pages = {}
+
+# Values of the closed columns of schema.py must be known (free text such as City or Profession may grow)
+MAX_REPORTED_ERRORS = 50
+
+
+def register(page, store, role, pressure_column, bounds):
+    pages[page] = (store, role, pressure_column, bounds)
+
+
+def validate(rows, df, columns, role):
+    errors = []
+    missing = [column for column in columns if column not in rows.columns]
+    if missing:
+        return [{'error': 'missing columns', 'columns': missing}]
+
+    for column in columns:
+        values = rows[column]
+        if is_numeric_dtype(df[column]):
+            numbers = pd.to_numeric(values, errors='coerce')
+            bad = numbers.isna()
+            if is_integer_dtype(df[column]):
+                info = np.iinfo(df[column].dtype)   # int8 for the scores of schema.py
+                bad |= (numbers % 1 != 0) | (numbers < info.min) | (numbers > info.max)
+            rows[column] = numbers
+        else:
+            bad = values.isna() | (values.astype(str).str.strip() == '')
+            if column in schema.CLOSED:
+                bad |= ~values.isin(schema.categories(column))
+        errors += [{'row': int(i), 'column': column, 'value': str(values.iloc[i])} for i in np.flatnonzero(bad.to_numpy())]
+
+    wrong_role = rows['Working Professional or Student'] != role
+    errors += [{'row': int(i), 'column': 'Working Professional or Student', 'value': str(rows['Working Professional or Student'].iloc[i])}
+               for i in np.flatnonzero(wrong_role.to_numpy())]
+    return errors
+
+
+def _allowed(req):
+    token = os.environ.get('INGEST_TOKEN')
+    if token and req.headers.get('X-Ingest-Token') == token:
+        return True
+    try:
+        return ipaddress.ip_address(req.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+@blueprint.route('/ingest/<page>', methods=['POST'])
+def ingest(page):
+    if not _allowed(request):
+        return jsonify({'error': 'forbidden'}), 403
+    if page not in pages:
+        return jsonify({'error': f'unknown page {page!r}', 'pages': sorted(pages)}), 404
+    store, role, pressure_column, bounds = pages[page]
+
+    try:
+        if request.is_json:
+            rows = pd.DataFrame(request.get_json())
+        else:
+            rows = pd.read_csv(io.BytesIO(request.get_data()))
+    except Exception as e:
+        return jsonify({'error': f'unreadable body: {e}'}), 400
+    if rows.empty:
+        return jsonify({'added': 0})
+
+    data = store.get()
+    derived = [f'{pressure_column} Level', 'Depression_numeric']
+    columns = [column for column in store.csv_columns if column not in derived]
+    errors = validate(rows, data.df, columns, role)
+    if errors:
+        return jsonify({'error': 'invalid rows', 'details': errors[:MAX_REPORTED_ERRORS], 'count': len(errors)}), 400
+
+    for column in columns:
+        if is_integer_dtype(data.df[column]):
+            rows[column] = rows[column].astype(data.df[column].dtype)
+    rows = pipeline.add_page_columns(rows[columns].copy(), pressure_column, bounds)
+
+    with csv_lock(store.path, exclusive=True):
+        with open(store.path, 'a', newline='') as f:
+            rows[store.csv_columns].to_csv(f, header=False, index=False)
+
+    # Pick the new rows up right away in this worker; the others do on their next request
+    data = store.get()
+    return jsonify({'added': len(rows), 'rows': len(data.df), 'version': data.version})
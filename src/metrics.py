@@ -0,0 +1,149 @@
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import Blueprint, Response, g, has_request_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess
+
+# Prometheus metrics served on /metrics.
+#
+# Callbacks decorated with @instrument(page) record their duration, the time
+# spent in each stage (filter, aggregate, bootstrap, figure, serialize) and the size of
+# the response sent back to the browser. Stages are timed with `stage(name)`
+# blocks in the data cube and the figure cache; nested stages only count their
+# own time. 'serialize' covers both figure JSON encoding in the cache and Dash
+# encoding the response after the callback returns.
+#
+# Under gunicorn every worker has its own counters: set PROMETHEUS_MULTIPROC_DIR
+# (gunicorn.conf.py does) so all workers write them to files that /metrics merges.
+
+CALLBACK_SECONDS = Histogram(
+    'dashboard_callback_duration_seconds', 'Time spent in a Dash callback',
+    ['page', 'callback'],
+)
+STAGE_SECONDS = Histogram(
+    'dashboard_callback_stage_seconds', 'Time spent in one stage of a Dash callback',
+    ['page', 'callback', 'stage'],
+)
+PAYLOAD_BYTES = Histogram(
+    'dashboard_callback_payload_bytes', 'Size of the Dash callback response body',
+    ['page', 'callback'],
+    buckets=[256 * 4 ** i for i in range(10)],   # 256 B .. 64 MiB
+)
+PREDICT_BATCH_ROWS = Histogram(
+    'dashboard_predict_batch_rows', 'Rows scored per model call by the prediction micro-batcher',
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096],
+)
+DATASET_ROWS = Gauge(
+    'dashboard_dataset_rows', 'Rows in the page dataset',
+    ['page'],
+    multiprocess_mode='livemax',   # workers catching up on appended rows report fewer
+)
+
+# (page, callback) of the callback running in this context, None outside callbacks
+_callback = ContextVar('metrics_callback', default=None)
+# Time spent in nested stages of the innermost running stage
+_nested = ContextVar('metrics_nested', default=None)
+# Dash callback id of a callback running outside its request (background jobs, see background.py)
+_callback_name = ContextVar('metrics_callback_name', default=None)
+# Called with the name of every stage that starts (progress of background jobs)
+_on_stage = ContextVar('metrics_on_stage', default=None)
+
+blueprint = Blueprint('metrics', __name__)
+
+
+def _callback_id(fn):
+    # Dash callback id (its outputs, e.g. 'barplot-cgpa1.figure') when called
+    # from a request, the function name otherwise (e.g. in benchmarks)
+    if _callback_name.get() is not None:
+        return _callback_name.get()
+    if has_request_context():
+        body = request.get_json(silent=True)
+        if isinstance(body, dict) and 'output' in body:
+            return body['output']
+    return fn.__name__
+
+
+def instrument(page):
+    # Decorator for Dash callbacks; goes below @callback
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            labels = (page, _callback_id(fn))
+            token = _callback.set(labels)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                _callback.reset(token)
+                CALLBACK_SECONDS.labels(*labels).observe(end - start)
+                if has_request_context():
+                    # Dash serializes the return value after this; record_response times it
+                    g.metrics_callback = labels
+                    g.metrics_returned = end
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def running_as(callback_id, on_stage=None):
+    # Run a callback away from its request under its Dash callback id,
+    # reporting the stages it goes through to `on_stage`
+    tokens = _callback_name.set(callback_id), _on_stage.set(on_stage)
+    try:
+        yield
+    finally:
+        _callback_name.reset(tokens[0])
+        _on_stage.reset(tokens[1])
+
+
+@contextmanager
+def stage(name):
+    on_stage = _on_stage.get()
+    if on_stage is not None:
+        on_stage(name)
+
+    labels = _callback.get()
+    if labels is None:
+        yield
+        return
+
+    parent = _nested.get()
+    nested = [0.0]
+    token = _nested.set(nested)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _nested.reset(token)
+        if parent is not None:
+            parent[0] += elapsed
+        STAGE_SECONDS.labels(*labels, name).observe(elapsed - nested[0])
+
+
+def set_dataset_rows(page, rows):
+    DATASET_ROWS.labels(page).set(rows)
+
+
+@blueprint.after_app_request
+def record_response(response):
+    labels = g.pop('metrics_callback', None)
+    if labels is not None and not response.is_streamed:
+        STAGE_SECONDS.labels(*labels, 'serialize').observe(time.perf_counter() - g.pop('metrics_returned'))
+        PAYLOAD_BYTES.labels(*labels).observe(len(response.get_data()))
+    return response
+
+
+@blueprint.route('/metrics')
+def metrics():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Merge the files of every (live and dead) worker on each scrape
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
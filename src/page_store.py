@@ -0,0 +1,149 @@
+import io
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data_cube import DataCube
+from dataset_store import read_dataset
+from filter_index import FilterIndex
+from metrics import set_dataset_rows
+import schema
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process file locking
+    fcntl = None
+
+
+@contextmanager
+def csv_lock(path, exclusive):
+    # Advisory lock shared by every worker: appenders take it exclusively,
+    # readers shared, so nobody reads a CSV while rows are being appended
+    if fcntl is None:
+        yield
+        return
+    with open(f'{path}.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def concat_frames(df, delta):
+    # Append delta to df column by column, merging the category sets of open
+    # categorical columns (closed ones have the same categories on both sides)
+    columns = {}
+    for column in df.columns:
+        old, new = df[column], delta[column]
+        if isinstance(old.dtype, pd.CategoricalDtype) and not old.dtype.ordered and old.dtype != new.dtype:
+            columns[column] = union_categoricals([old.array, pd.Categorical(new.astype(object))], sort_categories=True)
+        else:
+            columns[column] = pd.concat([old, new.astype(old.dtype)], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+@dataclass
+class PageData:
+    df: pd.DataFrame
+    filter_index: FilterIndex
+    cubes: dict
+    version: int   # mtime of the CSV it was loaded from, the same in every worker
+
+
+class PageStore:
+    # Owns a page dataset and the structures derived from it (filter index and
+    # data cubes). Callbacks always read one consistent PageData snapshot via
+    # get(); a new snapshot is swapped in as a whole when the CSV changes.
+    #
+    # The CSV is watched: rows appended to it (e.g. by the /ingest endpoint) are
+    # read from the end of the file only, and the index and cubes are extended by
+    # that delta. Any other change to the file triggers a full rebuild.
+
+    FINGERPRINT_BYTES = 256
+
+    def __init__(self, path, index_columns, cubes, prepare=None, name=None):
+        self.path = path
+        self.name = name                   # page name reported in metrics
+        self._prepare = prepare or (lambda df: df)   # typed DataFrame read from the CSV -> page DataFrame
+        self.index_columns = index_columns
+        self.cube_specs = cubes            # {name: (dims, measures)}
+        self.csv_columns = None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._size = 0                     # bytes of the CSV reflected in self.data
+        self._fingerprint = b''
+        self.data = None
+
+    def get(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if self.data is None or mtime != self._mtime:
+            with self._lock:
+                if self.data is None or os.stat(self.path).st_mtime_ns != self._mtime:
+                    self._refresh()
+        return self.data
+
+    def version(self):
+        # Version get() returns for the CSV as it is now, without loading it
+        return os.stat(self.path).st_mtime_ns
+
+    def rebuild(self):
+        # Rebuild hook: force a reload of the CSV and all derived structures
+        with self._lock, csv_lock(self.path, exclusive=False):
+            self._rebuild(os.stat(self.path))
+        return self.data
+
+    def _refresh(self):
+        with csv_lock(self.path, exclusive=False):
+            stat = os.stat(self.path)
+            if self.data is not None and stat.st_size > self._size and self._read_fingerprint(self._size) == self._fingerprint:
+                self._append_tail(stat)
+            else:
+                self._rebuild(stat)
+
+    def _read_fingerprint(self, size):
+        # Last bytes before `size`, used to check that the file was only appended to
+        with open(self.path, 'rb') as f:
+            f.seek(max(size - self.FINGERPRINT_BYTES, 0))
+            return f.read(min(size, self.FINGERPRINT_BYTES))
+
+    def _rebuild(self, stat):
+        raw = schema.enforce(read_dataset(self.path))
+        self.csv_columns = list(raw.columns)
+        df = self._prepare(raw)
+        cubes = {
+            name: DataCube(df, dims, measures)
+            for name, (dims, measures) in self.cube_specs.items()
+        }
+        self._swap(PageData(df, FilterIndex(df, self.index_columns), cubes, stat.st_mtime_ns), stat.st_size)
+
+    def _append_tail(self, stat):
+        with open(self.path, 'rb') as f:
+            f.seek(self._size)
+            tail = f.read(stat.st_size - self._size)
+
+        # Only complete lines; a row still being written is picked up next time
+        end = tail.rfind(b'\n') + 1
+        if end == 0:
+            return
+        delta = schema.enforce(pd.read_csv(io.BytesIO(tail[:end]), header=None, names=self.csv_columns))
+
+        old = self.data
+        df = concat_frames(old.df, self._prepare(delta))
+        # Take the delta back from the combined frame so it shares its dtypes and categories
+        delta = df.iloc[len(old.df):]
+        cubes = {name: cube.extended(delta) for name, cube in old.cubes.items()}
+        self._swap(PageData(df, old.filter_index.extended(delta), cubes, stat.st_mtime_ns), self._size + end)
+
+    def _swap(self, data, size):
+        # A single attribute assignment: callbacks see either the old or the new snapshot
+        self.data = data
+        self._mtime = data.version
+        self._size = size
+        self._fingerprint = self._read_fingerprint(size)
+        if self.name is not None:
+            set_dataset_rows(self.name, len(data.df))
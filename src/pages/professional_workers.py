@@ -1,116 +1,203 @@
 import pandas as pd
 import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
+from dash import dcc, html, Input, Output, State, Patch, callback
+import dash_bootstrap_components as dbc
 import plotly.colors
 import plotly.graph_objects as go
 import math
+from page_store import PageStore
+from figure_cache import figure_cache
+import background
+import cohorts
+import export
+import ingest
+import metrics
+from hierarchy import drill, hierarchy
+from themes import themed
+import pipeline
 
 # Register the page for Dash
 dash.register_page(__name__)
 
-# Load the dataset
-try:
-    df = pd.read_csv("../assets/df_work_professionals.csv")
-except Exception as e:
-    print(f'File reading error: {str(e)}')
-    exit()
+filter_dims = ['Age', 'Degree', 'Gender', 'Work Pressure Level', 'Profession']
 
-# Assign age groups directly
-df['Age Group'] = df['Age']
+# The dataset, its filter index and the pre-aggregated cubes behind every chart.
+# Columns are typed by src/schema.py ('Work Pressure Level' and
+# 'Depression_numeric' are precomputed by src/pipeline.py); ordered categoricals
+# keep Age groups, Degrees and pressure levels in their natural order.
+# 'profession' serves the bar and pie charts, 'detail' the sunburst and the
+# Gender x City chart. Kept up to date as the CSV changes; appended rows are
+# ingested incrementally.
+store = PageStore(
+    "../assets/df_work_professionals.csv",
+    index_columns=filter_dims,
+    cubes={
+        'profession': (filter_dims, ['Work Pressure', 'Depression_numeric']),
+        'detail': (filter_dims + ['City', 'Sleep Duration', 'Dietary Habits'], ['Financial Stress']),
+    },
+    name='professional-workers',
+)
+
+# New responses can be appended through POST /ingest/professional-workers
+ingest.register('professional-workers', store, 'Working Professional', 'Work Pressure', pipeline.WORK_PRESSURE_BOUNDS)
 
-# Define work pressure levels
-work_pressure_order = {"Low": 0, "Medium": 1, "High": 2}
-df['Work Pressure Level'] = df['Work Pressure'].apply(lambda x: 'Low' if x <= 1 else ('Medium' if x <= 3 else 'High'))
+# The filtered rows can be downloaded from /export/professional-workers.csv or .parquet
+export.register('professional-workers', store)
 
-# Convert 'Depression' column to numeric: 'Yes' = 1, 'No' = 0
-df['Depression_numeric'] = df['Depression'].apply(lambda x: 1 if x == 'Yes' else 0)
+# Cohort ranking: cohorts are combinations of values of the dropdown columns;
+# the first measure ranks them (see cohorts.py)
+cohort_dims = filter_dims[:4]
+default_cohort_dims = ['Age', 'Gender']
+cohort_measures = {'Depression rate': 'Depression_numeric', 'Financial Stress': 'Financial Stress', 'Work Pressure': 'Work Pressure'}
+top_cohorts = 15
 
 # Define a Bootstrap-like color palette from Plotly
 color_palette = plotly.colors.qualitative.Pastel
-age_order = {'Under 25': 0, '25-34': 1, '35-44': 2, '45-54': 3, '+55': 4}
-degree_order = {'Pre-University': 0, 'Undergraduate': 1, 'Postgraduate': 2, 'Doctorate/Professional': 3, 'Other': 4}
-
-# Layout with dropdowns and graphs
-layout = html.Div([
-    html.Div([
-        html.Label("Select Age Group:"),
-        dcc.Dropdown(
-            id='age-group-dropdown',
-            options=[{'label': age_group, 'value': age_group} for age_group in sorted(df['Age'].unique(), key=lambda x: age_order[x])],
-            value=None,
-            placeholder="Select an age group",
-            style={'marginBottom': '15px'}
-        ),
 
-        html.Label("Select Degree Category:"),
-        dcc.Dropdown(
-            id='degree-category-dropdown',
-            options=[{'label': degree, 'value': degree} for degree in sorted(df['Degree'].unique(), key=lambda x: degree_order[x])],
-            value=None,
-            placeholder="Select a degree category",
-            style={'marginBottom': '15px'}
-        ),
+@themed
+def pie_figure(not_depressed, depressed):
+    return go.Figure(
+        go.Pie(
+            labels=['Not Depressed', 'Depressed'],
+            values=[not_depressed, depressed],
+            hole=0.4,
+            marker=dict(colors=['lightgreen', 'lightcoral'])
+        )
+    )
 
-        html.Label("Select Gender:"),
-        dcc.Dropdown(
-            id='gender-dropdown',
-            options=[{'label': gender, 'value': gender} for gender in df['Gender'].unique()],
-            value=None,
-            placeholder="Select a gender",
-            style={'marginBottom': '15px'}
-        ),
+def cached_figure(chart, filters, build):
+    # Serve the figure from the shared figure cache (or the figures prebuilt at
+    # deploy time), building it from the cubes on a miss. The key only needs the
+    # CSV version, so the dataset is not loaded for a cached figure.
+    key = figure_cache.make_key('professional-workers', chart, store.version(), filters)
+    return figure_cache.get_or_build(key, lambda: build(store.get().cubes, filters))
 
-        html.Label("Select Work Pressure Level:"),
-        dcc.Dropdown(
-            id='work-pressure-dropdown',
-            options=[{'label': level, 'value': level} for level in work_pressure_order.keys()],
-            value=None,
-            placeholder="Select work pressure level",
-            style={'marginBottom': '15px'}
-        ),
-    ], style={'width': '20%', 'float': 'left', 'padding': '10px'}),
+@themed
+def financial_stress_figure(cubes, filters):
+    # Average Financial Stress by Gender and City over the whole dataset (filters are ignored)
+    import plotly.express as px  # Deferred: only needed when a figure is not prebuilt
+    return px.bar(
+        cubes['detail'].rollup(['Gender', 'City'])[['Gender', 'City', 'Financial Stress_mean']].rename(columns={'Financial Stress_mean': 'Financial Stress'}),
+        x="Gender", y="Financial Stress", color="City",
+        title="Average Financial Stress by Gender and City",
+        labels={"Financial Stress": "Avg Financial Stress"},
+        barmode="group"
+    )
 
-    html.Div([
+# Layout with dropdowns and graphs (built per page visit so it follows the current data).
+# The dataset is loaded on the first visit, not when the app starts.
+def layout(**kwargs):
+    try:
+        df = store.get().df
+    except Exception as e:
+        return dbc.Alert(f"Could not load the dataset: {e}", color='danger')
+    return html.Div([
         html.Div([
-            dcc.Graph(id='barplot-profession', style={'height': '400px'}),
-            dcc.Graph(id='pie-depression', config={'displayModeBar': False}, style={'height': '400px'})
-        ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+            html.Label("Select Age Group:"),
+            dcc.Dropdown(
+                id='age-group-dropdown',
+                options=[{'label': age_group, 'value': age_group} for age_group in df['Age'].drop_duplicates().sort_values()],
+                value=None,
+                placeholder="Select an age group",
+                style={'marginBottom': '15px'}
+            ),
+
+            html.Label("Select Degree Category:"),
+            dcc.Dropdown(
+                id='degree-category-dropdown',
+                options=[{'label': degree, 'value': degree} for degree in df['Degree'].drop_duplicates().sort_values()],
+                value=None,
+                placeholder="Select a degree category",
+                style={'marginBottom': '15px'}
+            ),
+
+            html.Label("Select Gender:"),
+            dcc.Dropdown(
+                id='gender-dropdown',
+                options=[{'label': gender, 'value': gender} for gender in df['Gender'].unique()],
+                value=None,
+                placeholder="Select a gender",
+                style={'marginBottom': '15px'}
+            ),
+
+            html.Label("Select Work Pressure Level:"),
+            dcc.Dropdown(
+                id='work-pressure-dropdown',
+                options=[{'label': level, 'value': level} for level in df['Work Pressure Level'].cat.categories],
+                value=None,
+                placeholder="Select work pressure level",
+                style={'marginBottom': '15px'}
+            ),
+
+            # Download links for the rows matching the filters (streamed by export.py)
+            html.Label("Export the filtered rows:"),
+            html.Div([
+                html.A("CSV", id='export-csv', href=export.url('professional-workers', 'csv', {}), className="btn btn-outline-dark btn-sm me-2"),
+                html.A("Parquet", id='export-parquet', href=export.url('professional-workers', 'parquet', {}), hidden=not export.PARQUET_AVAILABLE,
+                       className="btn btn-outline-dark btn-sm"),
+            ]),
+        ], style={'width': '20%', 'float': 'left', 'padding': '10px'}),
 
         html.Div([
-            dcc.Graph(id='sunburst-chart', style={'height': '400px'}),
-            dcc.Graph(id='animated-bar-chart', style={'height': '400px'})
-        ], style={'display': 'flex', 'justifyContent': 'space-between'})
-    ], style={'width': '80%', 'float': 'right', 'padding': '10px'})
-])
-
-# Callback to update graphs based on selection
-@callback(
-    [Output('barplot-profession', 'figure'),
-     Output('pie-depression', 'figure'),
-     Output('sunburst-chart', 'figure'),
-     Output('animated-bar-chart', 'figure')],  # Added output for animated bar chart
-    [Input('age-group-dropdown', 'value'),
-     Input('degree-category-dropdown', 'value'),
-     Input('gender-dropdown', 'value'),
-     Input('work-pressure-dropdown', 'value'),
-     Input('barplot-profession', 'clickData')]  # Capture clickData for interaction
-)
-def update_graphs(selected_age_group, selected_degree_category, selected_gender, selected_work_pressure, click_data):
-    # Filter the data (this filter will apply to all charts)
-    filtered_df = df
-    if selected_age_group:
-        filtered_df = filtered_df[filtered_df['Age Group'] == selected_age_group]
-    if selected_degree_category:
-        filtered_df = filtered_df[filtered_df['Degree'] == selected_degree_category]
-    if selected_gender:
-        filtered_df = filtered_df[filtered_df['Gender'] == selected_gender]
-    if selected_work_pressure:
-        filtered_df = filtered_df[filtered_df['Work Pressure Level'] == selected_work_pressure]
-
-    # Update bar chart (showing all professions)
-    profession_fig = px.bar(
-        filtered_df.groupby('Profession')['Work Pressure'].mean().reset_index(),
+            # Progress of the charts computed in the background (see background.py)
+            html.Div([background.status(graph_id) for graph_id in ['barplot-profession', 'sunburst-chart', 'cohort-ranking']]),
+
+            html.Div([
+                dcc.Graph(id='barplot-profession', style={'height': '400px'}),
+                # The pie is only ever patched by update_pie, so it starts as an empty donut
+                dcc.Graph(id='pie-depression', figure=cached_figure('pie', {}, lambda *_: pie_figure(0, 0)), config={'displayModeBar': False}, style={'height': '400px'})
+            ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+
+            html.Div([
+                dcc.Graph(id='sunburst-chart', style={'height': '400px'}),
+                # Node the sunburst is drilled into (see hierarchy.py)
+                dcc.Store(id='sunburst-root'),
+                # Does not depend on any filter, so no callback is needed
+                dcc.Graph(id='animated-bar-chart', figure=cached_figure('financial-stress', {}, financial_stress_figure), style={'height': '400px'})
+            ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+
+            # Depression rate and mean scores of each cohort with bootstrap confidence intervals
+            html.Div([
+                html.Label("Compare cohorts by:"),
+                dcc.Dropdown(
+                    id='cohort-dims',
+                    options=[{'label': dim, 'value': dim} for dim in cohort_dims],
+                    value=default_cohort_dims,
+                    multi=True,
+                ),
+                dcc.Graph(id='cohort-ranking', style={'height': '550px'}),
+            ], style={'padding': '10px'})
+        ], style={'width': '80%', 'float': 'right', 'padding': '10px'})
+    ])
+
+filter_inputs = [
+    Input('age-group-dropdown', 'value'),
+    Input('degree-category-dropdown', 'value'),
+    Input('gender-dropdown', 'value'),
+    Input('work-pressure-dropdown', 'value'),
+]
+
+def get_filters(selected_age_group, selected_degree_category, selected_gender, selected_work_pressure, click_data=None):
+    filters = {
+        'Age': selected_age_group,
+        'Degree': selected_degree_category,
+        'Gender': selected_gender,
+        'Work Pressure Level': selected_work_pressure,
+    }
+    # Charts below the bar plot only show the clicked profession (if any)
+    if click_data:
+        filters['Profession'] = click_data['points'][0]['x']
+    return filters
+
+# Each chart has its own callback so a change only recomputes (and sends back)
+# the figures that depend on it: a bar click never rebuilds the bar chart.
+
+# Update bar chart (showing all professions)
+@themed
+def barplot_figure(cubes, filters):
+    import plotly.express as px  # Deferred: only needed when a figure is not prebuilt
+    return px.bar(
+        cubes['profession'].rollup(['Profession'], filters)[['Profession', 'Work Pressure_mean']].rename(columns={'Work Pressure_mean': 'Work Pressure'}),
         x='Profession', y='Work Pressure',
         title="Profession vs Average Work Pressure",
         template="minty",
@@ -119,52 +206,108 @@ def update_graphs(selected_age_group, selected_degree_category, selected_gender,
         color_discrete_sequence=color_palette
     )
 
-    # Filter pie chart based on the clicked profession (if any)
-    if click_data:
-        clicked_profession = click_data['points'][0]['x']
-        filtered_df = filtered_df[filtered_df['Profession'] == clicked_profession]
+@background.chart_callback('barplot-profession', Output('barplot-profession', 'figure'), filter_inputs)
+@metrics.instrument('professional-workers')
+def update_barplot(*selection):
+    return cached_figure('barplot', get_filters(*selection), barplot_figure)
 
-    # Update pie chart based on filtered data
-    pie_fig = go.Figure(
-        go.Pie(
-            labels=['Not Depressed', 'Depressed'],
-            values=[filtered_df['Depression_numeric'].value_counts().get(0, 0),
-                    filtered_df['Depression_numeric'].value_counts().get(1, 0)],
-            hole=0.4,
-            marker=dict(colors=['lightgreen', 'lightcoral'])
-        )
-    )
+# Update pie chart based on filtered data (and the clicked profession, if any)
+@callback(Output('pie-depression', 'figure'), filter_inputs + [Input('barplot-profession', 'clickData')])
+@metrics.instrument('professional-workers')
+def update_pie(*selection):
+    totals = store.get().cubes['profession'].rollup((), get_filters(*selection)).iloc[0]
+    depressed = int(totals['Depression_numeric_sum'])
+
+    # Only the two slice values change, so send a partial update
+    pie_patch = Patch()
+    pie_patch['data'][0]['values'] = [int(totals['count']) - depressed, depressed]
+    return pie_patch
 
-    # Create Sunburst Chart
-    # Group by the necessary columns
-    agg_df = filtered_df.groupby(['City', 'Dietary Habits', 'Sleep Duration', 'Work Pressure Level']).agg(
-        count=('Depression_numeric', 'size')
-    ).reset_index()
-
-    # Calculate the total count for each combination of 'City', 'Sleep Duration', and 'Work Pressure Level'
-    agg_df['total_count'] = agg_df.groupby(['City', 'Sleep Duration', 'Work Pressure Level'])['count'].transform('sum')
-
-    # Now, calculate the percentage of each dietary habit group
-    agg_df['percentage_dietary_habits'] = (agg_df['count'] / agg_df['total_count']) * 100
-
-    # Create Sunburst Chart
-    sunburst_fig = px.sunburst(
-        agg_df,
-        path=['Work Pressure Level', 'Sleep Duration', 'City', 'Dietary Habits'],  # Hierarchy
-        values='count',  # Number of individuals in each category
-        color='percentage_dietary_habits',  # Color by percentage of dietary habits
-        color_continuous_scale='RdBu',  # Red for high, blue for low
-        title="Work Pressure, Activity Hours, City with Dietary Habit Percentages"
+# Create Sunburst Chart
+# Only two rings around the current node are sent; clicking a node drills into
+# it and clicking the center goes back up.
+sunburst_path = ['Work Pressure Level', 'Sleep Duration', 'City', 'Dietary Habits']
+
+@themed
+def sunburst_figure(cubes, filters, root=''):
+    nodes = hierarchy(cubes['detail'], sunburst_path, filters).subtree(root)
+
+    return go.Figure(
+        go.Sunburst(
+            ids=nodes['id'], labels=nodes['label'], parents=nodes['parent'],
+            values=nodes['count'],  # Number of individuals in each category
+            branchvalues='total',
+            # Color by each group's percentage of its parent (e.g. of a dietary habit within a city)
+            marker=dict(colors=nodes['share'] * 100, colorscale='RdBu', colorbar=dict(title='percentage')),
+            hovertemplate='<b>%{label}</b><br>%{value} individuals (%{color:.1f}% of parent)<extra></extra>',
+        ),
+        layout=dict(title="Work Pressure, Activity Hours, City with Dietary Habit Percentages", template="minty")
     )
 
+@background.chart_callback(
+    'sunburst-chart',
+    Output('sunburst-chart', 'figure'),
+    Output('sunburst-root', 'data'),
+    filter_inputs + [Input('barplot-profession', 'clickData'), Input('sunburst-chart', 'clickData')],
+    State('sunburst-root', 'data'),
+)
+@metrics.instrument('professional-workers')
+def update_sunburst(*selection):
+    *selection, sunburst_click, state = selection
+    filters = get_filters(*selection)
+    state = drill(lambda: hierarchy(store.get().cubes['detail'], sunburst_path, filters), state, filters, sunburst_click)
+    root = state['root']
+    return cached_figure('sunburst', {**filters, 'Sunburst Root': root}, lambda cubes, _: sunburst_figure(cubes, filters, root)), state
 
-    # Create Animated Bar Chart
-    animated_bar_fig = px.bar(
-        df.groupby(['Gender', 'City'], as_index=False)['Financial Stress'].mean(),
-        x="Gender", y="Financial Stress", color="City",
-        title="Average Financial Stress by Gender and City",
-        labels={"Financial Stress": "Avg Financial Stress"},
-        barmode="group"
+# Export links: follow the filters and the clicked profession. Only the URLs go
+# through Dash; the rows themselves are streamed by the /export route.
+@callback(Output('export-csv', 'href'), Output('export-parquet', 'href'), filter_inputs + [Input('barplot-profession', 'clickData')])
+def update_export_links(*selection):
+    filters = get_filters(*selection)
+    return export.url('professional-workers', 'csv', filters), export.url('professional-workers', 'parquet', filters)
+
+# Cohort ranking: the top cohorts by depression rate among the filtered rows,
+# one panel per measure, with the confidence interval of each value
+@themed
+def cohort_ranking_figure(data, filters, dims):
+    from plotly.subplots import make_subplots  # Deferred: only needed when a figure is not prebuilt
+    with metrics.stage('filter'):
+        rows = data.filter_index.filter(data.df, filters)
+    ranking = cohorts.compare(rows, dims, cohort_measures).head(top_cohorts)
+    labels = ranking[dims].astype(str).agg(' · '.join, axis=1) if dims else pd.Series(['All respondents'] * len(ranking))
+
+    fig = make_subplots(rows=1, cols=len(cohort_measures), shared_yaxes=True, subplot_titles=list(cohort_measures))
+    for col, label in enumerate(cohort_measures, start=1):
+        value_format = '.1%' if col == 1 else '.2f'
+        fig.add_trace(go.Scatter(
+            x=ranking[label], y=labels, mode='markers',
+            error_x=dict(type='data', symmetric=False,
+                         array=ranking[f'{label} high'] - ranking[label], arrayminus=ranking[label] - ranking[f'{label} low']),
+            customdata=ranking[['count', f'{label} low', f'{label} high']],
+            hovertemplate=f'<b>%{{y}}</b><br>{label}: %{{x:{value_format}}} '
+                          f'[%{{customdata[1]:{value_format}}}, %{{customdata[2]:{value_format}}}]<br>%{{customdata[0]}} respondents<extra></extra>',
+        ), row=1, col=col)
+    fig.update_xaxes(tickformat='.0%', row=1, col=1)
+    fig.update_yaxes(autorange='reversed')
+    fig.update_layout(
+        title=f"Cohorts ranked by depression rate ({cohorts.CONFIDENCE:.0%} bootstrap intervals, cohorts of {cohorts.MIN_COHORT_SIZE}+ respondents)",
+        showlegend=False, template="minty",
     )
-    
-    return profession_fig, pie_fig, sunburst_fig, animated_bar_fig
\ No newline at end of file
+    if ranking.empty:
+        fig.add_annotation(text=f"No cohort of {cohorts.MIN_COHORT_SIZE}+ respondents matches the filters", showarrow=False, xref='paper', yref='paper', x=0.5, y=0.5)
+    return fig
+
+@background.chart_callback(
+    'cohort-ranking',
+    Output('cohort-ranking', 'figure'),
+    filter_inputs + [Input('barplot-profession', 'clickData'), Input('cohort-dims', 'value')],
+)
+@metrics.instrument('professional-workers')
+def update_cohort_ranking(*selection):
+    *selection, dims = selection
+    # In a fixed order, so the same cohorts are always the same cached figure
+    dims = default_cohort_dims if dims is None else [dim for dim in cohort_dims if dim in dims]
+    filters = get_filters(*selection)
+    # Computed from the rows rather than a cube, so cached here instead of via cached_figure
+    key = figure_cache.make_key('professional-workers', 'cohorts', store.version(), {**filters, 'Cohorts': dims})
+    return figure_cache.get_or_build(key, lambda: cohort_ranking_figure(store.get(), filters, dims))
@@ -0,0 +1,151 @@
+import base64
+import io
+
+import dash
+from dash import dcc, html, Input, Output, State, callback
+import dash_bootstrap_components as dbc
+import pandas as pd
+import metrics
+from predict import ModelUnavailable, predictor
+
+# Register the page for Dash
+dash.register_page(__name__)
+
+# Shown on the page and returned for uploads (the scored rows keep their own columns too)
+MAX_TABLE_ROWS = 200
+
+def dropdown(id, label, options, value):
+    return html.Div([
+        html.Label(label),
+        dcc.Dropdown(id=id, options=[{'label': option, 'value': option} for option in options], value=value, clearable=False,
+                     style={'marginBottom': '10px'}),
+    ])
+
+def number(id, label, value, min, max):
+    return html.Div([
+        html.Label(label),
+        dbc.Input(id=id, type='number', value=value, min=min, max=max, style={'marginBottom': '10px'}),
+    ])
+
+# Form fields: component id -> survey column
+FIELDS = {
+    'risk-gender': 'Gender',
+    'risk-age': 'Age',
+    'risk-city': 'City',
+    'risk-role': 'Working Professional or Student',
+    'risk-profession': 'Profession',
+    'risk-academic-pressure': 'Academic Pressure',
+    'risk-work-pressure': 'Work Pressure',
+    'risk-study-satisfaction': 'Study Satisfaction',
+    'risk-job-satisfaction': 'Job Satisfaction',
+    'risk-sleep': 'Sleep Duration',
+    'risk-diet': 'Dietary Habits',
+    'risk-degree': 'Degree',
+    'risk-suicidal': 'Have you ever had suicidal thoughts ?',
+    'risk-hours': 'Work/Study Hours',
+    'risk-financial-stress': 'Financial Stress',
+    'risk-family-history': 'Family History of Mental Illness',
+}
+
+# Layout with the survey form and a CSV upload (built per page visit, once the model is loaded)
+def layout(**kwargs):
+    import features  # With the model, on first use (see predict.py)
+    try:
+        categories = predictor.encoder.categories_
+    except ModelUnavailable as e:
+        return dbc.Alert(str(e), color='warning')
+
+    form = html.Div([
+        dropdown('risk-gender', "Gender:", categories['Gender'], categories['Gender'][0]),
+        number('risk-age', "Age:", 30, 18, 100),
+        dropdown('risk-city', "City:", sorted(features.CITY_POPULATION), 'Delhi'),
+        dropdown('risk-role', "Working Professional or Student:", categories['Working Professional or Student'], 'Student'),
+        dropdown('risk-profession', "Profession (professionals only):", categories['Profession'], 'Uknown'),
+        number('risk-academic-pressure', "Academic Pressure (1-5, students):", 3, 0, 5),
+        number('risk-work-pressure', "Work Pressure (1-5, professionals):", 0, 0, 5),
+        number('risk-study-satisfaction', "Study Satisfaction (1-5, students):", 3, 0, 5),
+        number('risk-job-satisfaction', "Job Satisfaction (1-5, professionals):", 0, 0, 5),
+        dropdown('risk-sleep', "Sleep Duration:", list(features.SLEEP_MAPPING), '7-8 hours'),
+        dropdown('risk-diet', "Dietary Habits:", list(features.DIET_MAPPING), 'Moderate'),
+        dropdown('risk-degree', "Degree:", list(features.DEGREE_CATEGORY), 'Class 12'),
+        dropdown('risk-suicidal', "Have you ever had suicidal thoughts ?", categories['Have you ever had suicidal thoughts ?'], 'No'),
+        number('risk-hours', "Work/Study Hours:", 6, 0, 24),
+        number('risk-financial-stress', "Financial Stress (1-5):", 3, 1, 5),
+        dropdown('risk-family-history', "Family History of Mental Illness:", categories['Family History of Mental Illness'], 'No'),
+        html.Button("Score", id='risk-score-button', className="btn btn-dark mt-2"),
+    ], style={'width': '30%', 'float': 'left', 'padding': '10px'})
+
+    results = html.Div([
+        html.H4("Depression risk"),
+        html.Div(id='risk-score-result', className="mb-4"),
+
+        html.H4("Score a CSV file"),
+        html.P("Upload survey rows with the columns of the raw dataset (one response per row).", className="text-secondary"),
+        dcc.Upload(
+            id='risk-upload',
+            children=html.Div(["Drag and drop or ", html.A("select a CSV file")]),
+            style={'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px', 'textAlign': 'center', 'padding': '20px'},
+        ),
+        html.Div(id='risk-upload-result', className="mt-3"),
+    ], style={'width': '70%', 'float': 'right', 'padding': '10px'})
+
+    return html.Div([form, results])
+
+def score(rows):
+    # Validate and score survey rows; returns (probabilities, None) or (None, error message)
+    errors = predictor.validate(rows)
+    if errors:
+        details = '; '.join(f"row {e['row']}: {e['column']}={e['value']!r}" if 'row' in e else f"{e['error']}: {', '.join(e['columns'])}"
+                            for e in errors[:5])
+        return None, f"{len(errors)} invalid value(s): {details}"
+    return predictor.predict(rows), None
+
+@callback(
+    Output('risk-score-result', 'children'),
+    Input('risk-score-button', 'n_clicks'),
+    [State(id, 'value') for id in FIELDS],
+    prevent_initial_call=True,
+)
+@metrics.instrument('risk-scoring')
+def update_score(n_clicks, *values):
+    record = dict(zip(FIELDS.values(), values))
+    # Students have no profession, professionals no academic pressure (as in the survey)
+    if record['Working Professional or Student'] == 'Student':
+        record['Profession'] = None
+    else:
+        record['Academic Pressure'] = record['Study Satisfaction'] = None
+
+    probabilities, error = score(pd.DataFrame([record]))
+    if error:
+        return dbc.Alert(error, color='danger')
+    probability = probabilities[0]
+    return dbc.Alert(
+        f"{probability:.1%} probability of depression",
+        color='danger' if probability >= 0.5 else 'success',
+    )
+
+@callback(
+    Output('risk-upload-result', 'children'),
+    Input('risk-upload', 'contents'),
+    State('risk-upload', 'filename'),
+    prevent_initial_call=True,
+)
+@metrics.instrument('risk-scoring')
+def update_upload(contents, filename):
+    try:
+        rows = pd.read_csv(io.BytesIO(base64.b64decode(contents.split(',', 1)[1])))
+    except Exception as e:
+        return dbc.Alert(f"Could not read {filename}: {e}", color='danger')
+    if rows.empty:
+        return dbc.Alert(f"{filename} has no rows to score.", color='warning')
+
+    probabilities, error = score(rows)
+    if error:
+        return dbc.Alert(error, color='danger')
+
+    rows.insert(0, 'Depression probability', probabilities.round(3))
+    at_risk = int((probabilities >= 0.5).sum())
+    return html.Div([
+        html.P(f"{filename}: {len(rows)} rows scored, {at_risk} ({at_risk / len(rows):.1%}) at risk of depression."),
+        dbc.Table.from_dataframe(rows.head(MAX_TABLE_ROWS), striped=True, bordered=True, hover=True, size='sm'),
+    ])
@@ -1,121 +1,186 @@
 import pandas as pd
 import dash
-from dash import dcc, html, Input, Output, callback
-import plotly.express as px
+from dash import dcc, html, Input, Output, State, Patch, callback
+import dash_bootstrap_components as dbc
 import plotly.colors
 import plotly.graph_objects as go
+from page_store import PageStore
+from figure_cache import figure_cache
+import background
+import cohorts
+import export
+import ingest
+import metrics
+from hierarchy import drill, hierarchy
+from themes import themed
+import pipeline
 
 # Register the page for Dash
 dash.register_page(__name__)
 
-# Load the dataset
-try:
-    df = pd.read_csv("../assets/df_students.csv")
-except Exception as e:
-    print(f'File reading error: {str(e)}')
-    exit()
+# The dataset, its filter index and the pre-aggregated cube behind every chart.
+# Columns are typed by src/schema.py ('Academic Pressure Level' and
+# 'Depression_numeric' are precomputed by src/pipeline.py); ordered categoricals
+# keep Age groups, Degrees and pressure levels in their natural order.
+# Kept up to date as the CSV changes; appended rows are ingested incrementally.
+store = PageStore(
+    "../assets/df_students.csv",
+    index_columns=['Age', 'Degree', 'Gender', 'Academic Pressure Level', 'City'],
+    cubes={
+        'charts': (['Age', 'Degree', 'Gender', 'Academic Pressure Level', 'City', 'Sleep Duration', 'Dietary Habits'],
+                   ['CGPA', 'Depression_numeric', 'Financial Stress']),
+    },
+    name='students',
+)
 
-# Assign age groups directly
-df['Age Group'] = df['Age']
+# New responses can be appended through POST /ingest/students
+ingest.register('students', store, 'Student', 'Academic Pressure', pipeline.ACADEMIC_PRESSURE_BOUNDS)
 
-# Define academic pressure levels (low, medium, high)
-academic_pressure_order = {"Low": 0, "Medium": 1, "High": 2}
-df['Academic Pressure Level'] = df['Academic Pressure'].apply(lambda x: 'Low' if x <= 4 else ('Medium' if x <= 7 else 'High'))
+# The filtered rows can be downloaded from /export/students.csv or .parquet
+export.register('students', store)
 
-# Convert 'Depression' column to numeric: 'Yes' = 1, 'No' = 0
-df['Depression_numeric'] = df['Depression'].apply(lambda x: 1 if x == 'Yes' else 0)
+# Cohort ranking: cohorts are combinations of values of the dropdown columns;
+# the first measure ranks them (see cohorts.py)
+cohort_dims = ['Age', 'Degree', 'Gender', 'Academic Pressure Level']
+default_cohort_dims = ['Age', 'Gender']
+cohort_measures = {'Depression rate': 'Depression_numeric', 'Financial Stress': 'Financial Stress', 'Academic Pressure': 'Academic Pressure'}
+top_cohorts = 15
 
 # Define a Bootstrap-like color palette from Plotly
 color_palette = plotly.colors.qualitative.Pastel
-age_order = {'Under 25': 0, '25-34': 1, '35-44': 2, '45-54': 3, '+55': 4}
-degree_order = {'Pre-University': 0, 'Undergraduate': 1, 'Postgraduate': 2, 'Doctorate/Professional': 3, 'Other': 4}
-
-# Layout with dropdowns and graphs
-layout = html.Div([
-    html.Div([
-        html.Label("Select Age Group:"),
-        dcc.Dropdown(
-            id='age-group-dropdown',
-            options=[{'label': age_group, 'value': age_group} for age_group in sorted(df['Age'].unique(), key=lambda x: age_order[x])],
-            value=None,
-            placeholder="Select an age group",
-            style={'marginBottom': '15px'}
-        ),
 
-        html.Label("Select Degree Category:"),
-        dcc.Dropdown(
-            id='degree-category-dropdown',
-            options=[{'label': degree, 'value': degree} for degree in sorted(df['Degree'].unique(), key=lambda x: degree_order[x])],
-            value=None,
-            placeholder="Select a degree category",
-            style={'marginBottom': '15px'}
-        ),
+@themed
+def pie_figure(not_depressed, depressed):
+    return go.Figure(
+        go.Pie(
+            labels=['Not Depressed', 'Depressed'],
+            values=[not_depressed, depressed],
+            hole=0.4,
+            marker=dict(colors=['lightgreen', 'lightcoral'])
+        )
+    )
 
-        html.Label("Select Gender:"),
-        dcc.Dropdown(
-            id='gender-dropdown',
-            options=[{'label': gender, 'value': gender} for gender in df['Gender'].unique()],
-            value=None,
-            placeholder="Select a gender",
-            style={'marginBottom': '15px'}
-        ),
+# Layout with dropdowns and graphs (built per page visit so it follows the current data).
+# The dataset is loaded on the first visit, not when the app starts.
+def layout(**kwargs):
+    try:
+        df = store.get().df
+    except Exception as e:
+        return dbc.Alert(f"Could not load the dataset: {e}", color='danger')
+    return html.Div([
+        html.Div([
+            html.Label("Select Age Group:"),
+            dcc.Dropdown(
+                id='age-group-dropdown',
+                options=[{'label': age_group, 'value': age_group} for age_group in df['Age'].drop_duplicates().sort_values()],
+                value=None,
+                placeholder="Select an age group",
+                style={'marginBottom': '15px'}
+            ),
 
-        html.Label("Select Academic Pressure Level:"),
-        dcc.Dropdown(
-            id='academic-pressure-dropdown',
-            options=[{'label': level, 'value': level} for level in academic_pressure_order.keys()],
-            value=None,
-            placeholder="Select academic pressure level",
-            style={'marginBottom': '15px'}
-        ),
-    ], style={'width': '20%', 'float': 'left', 'padding': '10px'}),
+            html.Label("Select Degree Category:"),
+            dcc.Dropdown(
+                id='degree-category-dropdown',
+                options=[{'label': degree, 'value': degree} for degree in df['Degree'].drop_duplicates().sort_values()],
+                value=None,
+                placeholder="Select a degree category",
+                style={'marginBottom': '15px'}
+            ),
 
-    html.Div([
-        html.Div([
-            dcc.Graph(id='barplot-cgpa1', style={'height': '400px'}),
-            dcc.Graph(id='pie-depression1', config={'displayModeBar': False}, style={'height': '400px'})
-        ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+            html.Label("Select Gender:"),
+            dcc.Dropdown(
+                id='gender-dropdown',
+                options=[{'label': gender, 'value': gender} for gender in df['Gender'].unique()],
+                value=None,
+                placeholder="Select a gender",
+                style={'marginBottom': '15px'}
+            ),
+
+            html.Label("Select Academic Pressure Level:"),
+            dcc.Dropdown(
+                id='academic-pressure-dropdown',
+                options=[{'label': level, 'value': level} for level in df['Academic Pressure Level'].cat.categories],
+                value=None,
+                placeholder="Select academic pressure level",
+                style={'marginBottom': '15px'}
+            ),
+
+            # Download links for the rows matching the filters (streamed by export.py)
+            html.Label("Export the filtered rows:"),
+            html.Div([
+                html.A("CSV", id='export-csv1', href=export.url('students', 'csv', {}), className="btn btn-outline-dark btn-sm me-2"),
+                html.A("Parquet", id='export-parquet1', href=export.url('students', 'parquet', {}), hidden=not export.PARQUET_AVAILABLE,
+                       className="btn btn-outline-dark btn-sm"),
+            ]),
+        ], style={'width': '20%', 'float': 'left', 'padding': '10px'}),
 
         html.Div([
-            dcc.Graph(id='sunburst-chart1', style={'height': '400px'}),
-            dcc.Graph(id='animated-bar-chart1', style={'height': '400px'})
-        ], style={'display': 'flex', 'justifyContent': 'space-between'})
-    ], style={'width': '80%', 'float': 'right', 'padding': '10px'})
-])
-
-# Callback to update graphs based on selection
-@callback(
-    [Output('barplot-cgpa1', 'figure'),
-     Output('pie-depression1', 'figure'),
-     Output('sunburst-chart1', 'figure'),
-     Output('animated-bar-chart1', 'figure')],
-    [Input('age-group-dropdown', 'value'),
-     Input('degree-category-dropdown', 'value'),
-     Input('gender-dropdown', 'value'),
-     Input('academic-pressure-dropdown', 'value'),
-     Input('barplot-cgpa1', 'clickData')]
-)
-def update_graphs(selected_age_group, selected_degree_category, selected_gender, 
-                  selected_academic_pressure, click_data):
-    filtered_df = df
-    if selected_age_group:
-        filtered_df = filtered_df[filtered_df['Age'] == selected_age_group]
-    if selected_degree_category:
-        filtered_df = filtered_df[filtered_df['Degree'] == selected_degree_category]
-    if selected_gender:
-        filtered_df = filtered_df[filtered_df['Gender'] == selected_gender]
-    if selected_academic_pressure is not None:
-        filtered_df = filtered_df[filtered_df['Academic Pressure Level'] == selected_academic_pressure]
-    
-    # highlight_city = None
-    # if click_data and 'points' in click_data:
-    #     highlight_city = click_data_city['points'][0]['x']
-    
-    # Bar Plot: CGPA vs. City
-    bar_data = filtered_df.groupby('City')['CGPA'].mean().reset_index()
-    # bar_data['Highlight'] = bar_data['City'].apply(lambda x: 'Selected' if x == highlight_city else 'Others')
-    
-    barplot_fig = px.bar(
+            # Progress of the charts computed in the background (see background.py)
+            html.Div([background.status(graph_id) for graph_id in ['barplot-cgpa1', 'sunburst-chart1', 'animated-bar-chart1', 'cohort-ranking1']]),
+
+            html.Div([
+                dcc.Graph(id='barplot-cgpa1', style={'height': '400px'}),
+                # The pie is only ever patched by update_pie, so it starts as an empty donut
+                dcc.Graph(id='pie-depression1', figure=cached_figure('pie', {}, lambda *_: pie_figure(0, 0)), config={'displayModeBar': False}, style={'height': '400px'})
+            ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+
+            html.Div([
+                dcc.Graph(id='sunburst-chart1', style={'height': '400px'}),
+                # Node the sunburst is drilled into (see hierarchy.py)
+                dcc.Store(id='sunburst-root1'),
+                dcc.Graph(id='animated-bar-chart1', style={'height': '400px'})
+            ], style={'display': 'flex', 'justifyContent': 'space-between'}),
+
+            # Depression rate and mean scores of each cohort with bootstrap confidence intervals
+            html.Div([
+                html.Label("Compare cohorts by:"),
+                dcc.Dropdown(
+                    id='cohort-dims1',
+                    options=[{'label': dim, 'value': dim} for dim in cohort_dims],
+                    value=default_cohort_dims,
+                    multi=True,
+                ),
+                dcc.Graph(id='cohort-ranking1', style={'height': '550px'}),
+            ], style={'padding': '10px'})
+        ], style={'width': '80%', 'float': 'right', 'padding': '10px'})
+    ])
+
+filter_inputs = [
+    Input('age-group-dropdown', 'value'),
+    Input('degree-category-dropdown', 'value'),
+    Input('gender-dropdown', 'value'),
+    Input('academic-pressure-dropdown', 'value'),
+]
+
+def get_filters(selected_age_group, selected_degree_category, selected_gender, selected_academic_pressure, click_data=None):
+    filters = {
+        'Age': selected_age_group,
+        'Degree': selected_degree_category,
+        'Gender': selected_gender,
+        'Academic Pressure Level': selected_academic_pressure,
+    }
+    # Charts below the bar plot only show the clicked city (if any)
+    if click_data:
+        filters['City'] = click_data['points'][0]['x']
+    return filters
+
+def cached_figure(chart, filters, build):
+    # Serve the figure from the shared figure cache (or the figures prebuilt at
+    # deploy time), building it from the cube on a miss. The key only needs the
+    # CSV version, so the dataset is not loaded for a cached figure.
+    key = figure_cache.make_key('students', chart, store.version(), filters)
+    return figure_cache.get_or_build(key, lambda: build(store.get().cubes['charts'], filters))
+
+# Each chart has its own callback so a change only recomputes (and sends back)
+# the figures that depend on it: a bar click never rebuilds the bar plot.
+
+# Bar Plot: CGPA vs. City
+@themed
+def barplot_figure(cube, filters):
+    import plotly.express as px  # Deferred: only needed when a figure is not prebuilt
+    bar_data = cube.rollup(['City'], filters)[['City', 'CGPA_mean']].rename(columns={'CGPA_mean': 'CGPA'})
+
+    return px.bar(
         bar_data,
         x='City', y='CGPA',
         title="Average CGPA by City",
@@ -125,38 +190,124 @@ def update_graphs(selected_age_group, selected_degree_category, selected_gender,
         color_discrete_sequence=color_palette
     )
 
-    # Filter pie chart based on the clicked profession (if any)
-    if click_data:
-        clicked_city = click_data['points'][0]['x']
-        filtered_df = filtered_df[filtered_df['City'] == clicked_city]
+@background.chart_callback('barplot-cgpa1', Output('barplot-cgpa1', 'figure'), filter_inputs)
+@metrics.instrument('students')
+def update_barplot(*selection):
+    return cached_figure('barplot', get_filters(*selection), barplot_figure)
 
+# Pie Chart: Depression Distribution (filtered on the clicked city, if any)
+@callback(Output('pie-depression1', 'figure'), filter_inputs + [Input('barplot-cgpa1', 'clickData')])
+@metrics.instrument('students')
+def update_pie(*selection):
+    totals = store.get().cubes['charts'].rollup((), get_filters(*selection)).iloc[0]
+    depressed = int(totals['Depression_numeric_sum'])
 
-    # Pie Chart: Depression Distribution
-    pie_fig = go.Figure(
-        go.Pie(
-            labels=['Not Depressed', 'Depressed'],
-            values=[filtered_df['Depression_numeric'].value_counts().get(0, 0),
-                    filtered_df['Depression_numeric'].value_counts().get(1, 0)],
-            hole=0.4,
-            marker=dict(colors=['lightgreen', 'lightcoral'])
-        )
-    )
+    # Only the two slice values change, so send a partial update
+    pie_patch = Patch()
+    pie_patch['data'][0]['values'] = [int(totals['count']) - depressed, depressed]
+    return pie_patch
 
-    # Sunburst Chart: Academic Pressure, Sleep, City, Dietary Habits
-    sunburst_fig = px.sunburst(
-        filtered_df,
-        path=['Academic Pressure Level', 'Sleep Duration', 'City', 'Dietary Habits'],
-        values='Depression_numeric',
-        title="Academic Pressure, Sleep, City, and Dietary Habits"
+# Sunburst Chart: Academic Pressure, Sleep, City, Dietary Habits
+# Only two rings around the current node are sent; clicking a node drills into
+# it and clicking the center goes back up.
+sunburst_path = ['Academic Pressure Level', 'Sleep Duration', 'City', 'Dietary Habits']
+
+@themed
+def sunburst_figure(cube, filters, root=''):
+    nodes = hierarchy(cube, sunburst_path, filters).subtree(root)
+
+    return go.Figure(
+        go.Sunburst(
+            ids=nodes['id'], labels=nodes['label'], parents=nodes['parent'],
+            values=nodes['Depression_numeric_sum'],
+            branchvalues='total',
+            customdata=nodes[['count', 'Depression_numeric_rate']],
+            hovertemplate='<b>%{label}</b><br>Depressed: %{value} of %{customdata[0]} (%{customdata[1]:.0%})<extra></extra>',
+        ),
+        layout=dict(title="Academic Pressure, Sleep, City, and Dietary Habits", template="minty")
     )
 
-    # Animated Bar Chart: Financial Stress by Gender & City
-    animated_bar_fig = px.bar(
-        filtered_df.groupby(['Gender', 'City'], as_index=False)['Financial Stress'].mean(),
+@background.chart_callback(
+    'sunburst-chart1',
+    Output('sunburst-chart1', 'figure'),
+    Output('sunburst-root1', 'data'),
+    filter_inputs + [Input('barplot-cgpa1', 'clickData'), Input('sunburst-chart1', 'clickData')],
+    State('sunburst-root1', 'data'),
+)
+@metrics.instrument('students')
+def update_sunburst(*selection):
+    *selection, sunburst_click, state = selection
+    filters = get_filters(*selection)
+    state = drill(lambda: hierarchy(store.get().cubes['charts'], sunburst_path, filters), state, filters, sunburst_click)
+    root = state['root']
+    return cached_figure('sunburst', {**filters, 'Sunburst Root': root}, lambda cube, _: sunburst_figure(cube, filters, root)), state
+
+# Animated Bar Chart: Financial Stress by Gender & City
+@themed
+def financial_stress_figure(cube, filters):
+    import plotly.express as px  # Deferred: only needed when a figure is not prebuilt
+    return px.bar(
+        cube.rollup(['Gender', 'City'], filters)[['Gender', 'City', 'Financial Stress_mean']].rename(columns={'Financial Stress_mean': 'Financial Stress'}),
         x="Gender", y="Financial Stress", color="City",
         title="Average Financial Stress by Gender and City",
         labels={"Financial Stress": "Avg Financial Stress"},
         barmode="group"
     )
 
-    return barplot_fig, pie_fig, sunburst_fig, animated_bar_fig
+@background.chart_callback('animated-bar-chart1', Output('animated-bar-chart1', 'figure'), filter_inputs + [Input('barplot-cgpa1', 'clickData')])
+@metrics.instrument('students')
+def update_financial_stress(*selection):
+    return cached_figure('financial-stress', get_filters(*selection), financial_stress_figure)
+
+# Export links: follow the filters and the clicked city. Only the URLs go
+# through Dash; the rows themselves are streamed by the /export route.
+@callback(Output('export-csv1', 'href'), Output('export-parquet1', 'href'), filter_inputs + [Input('barplot-cgpa1', 'clickData')])
+def update_export_links(*selection):
+    filters = get_filters(*selection)
+    return export.url('students', 'csv', filters), export.url('students', 'parquet', filters)
+
+# Cohort ranking: the top cohorts by depression rate among the filtered rows,
+# one panel per measure, with the confidence interval of each value
+@themed
+def cohort_ranking_figure(data, filters, dims):
+    from plotly.subplots import make_subplots  # Deferred: only needed when a figure is not prebuilt
+    with metrics.stage('filter'):
+        rows = data.filter_index.filter(data.df, filters)
+    ranking = cohorts.compare(rows, dims, cohort_measures).head(top_cohorts)
+    labels = ranking[dims].astype(str).agg(' · '.join, axis=1) if dims else pd.Series(['All respondents'] * len(ranking))
+
+    fig = make_subplots(rows=1, cols=len(cohort_measures), shared_yaxes=True, subplot_titles=list(cohort_measures))
+    for col, label in enumerate(cohort_measures, start=1):
+        value_format = '.1%' if col == 1 else '.2f'
+        fig.add_trace(go.Scatter(
+            x=ranking[label], y=labels, mode='markers',
+            error_x=dict(type='data', symmetric=False,
+                         array=ranking[f'{label} high'] - ranking[label], arrayminus=ranking[label] - ranking[f'{label} low']),
+            customdata=ranking[['count', f'{label} low', f'{label} high']],
+            hovertemplate=f'<b>%{{y}}</b><br>{label}: %{{x:{value_format}}} '
+                          f'[%{{customdata[1]:{value_format}}}, %{{customdata[2]:{value_format}}}]<br>%{{customdata[0]}} respondents<extra></extra>',
+        ), row=1, col=col)
+    fig.update_xaxes(tickformat='.0%', row=1, col=1)
+    fig.update_yaxes(autorange='reversed')
+    fig.update_layout(
+        title=f"Cohorts ranked by depression rate ({cohorts.CONFIDENCE:.0%} bootstrap intervals, cohorts of {cohorts.MIN_COHORT_SIZE}+ respondents)",
+        showlegend=False, template="minty",
+    )
+    if ranking.empty:
+        fig.add_annotation(text=f"No cohort of {cohorts.MIN_COHORT_SIZE}+ respondents matches the filters", showarrow=False, xref='paper', yref='paper', x=0.5, y=0.5)
+    return fig
+
+@background.chart_callback(
+    'cohort-ranking1',
+    Output('cohort-ranking1', 'figure'),
+    filter_inputs + [Input('barplot-cgpa1', 'clickData'), Input('cohort-dims1', 'value')],
+)
+@metrics.instrument('students')
+def update_cohort_ranking(*selection):
+    *selection, dims = selection
+    # In a fixed order, so the same cohorts are always the same cached figure
+    dims = default_cohort_dims if dims is None else [dim for dim in cohort_dims if dim in dims]
+    filters = get_filters(*selection)
+    # Computed from the rows rather than a cube, so cached here instead of via cached_figure
+    key = figure_cache.make_key('students', 'cohorts', store.version(), {**filters, 'Cohorts': dims})
+    return figure_cache.get_or_build(key, lambda: cohort_ranking_figure(store.get(), filters, dims))
@@ -0,0 +1,116 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Streaming ETL that builds the dashboard datasets in assets/ from the raw
+# survey, reproducing the "Grouping columns into categories" steps of
+# sadbrainanalytics.ipynb. The survey is read in chunks and every transform is
+# a vectorized map/cut, so inputs larger than memory are fine.
+#
+#   python src/pipeline.py [--input ...] [--output-dir ...] [--chunksize N]
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RAW_DATASET = os.path.join(ROOT_DIR, 'dataset', 'final_depression_dataset_1.csv')
+ASSETS_DIR = os.path.join(ROOT_DIR, 'assets')
+
+STUDENTS_FILE = 'df_students.csv'
+PROFESSIONALS_FILE = 'df_work_professionals.csv'
+
+# Degree categories used by the dashboard (anything else is 'Other')
+DEGREE_CATEGORIES = {
+    'Pre-University': ['Class 12'],
+    'Undergraduate': ['B.Com', 'BA', 'B.Tech', 'B.Sc', 'B.Arch', 'B.Ed',
+                      'B.Pharm', 'LLB', 'BBA', 'BHM', 'BE', 'BCA'],
+    'Postgraduate': ['M.Com', 'MA', 'M.Tech', 'M.Sc', 'M.Ed', 'MBA',
+                     'MCA', 'LLM', 'ME', 'MHM', 'M.Pharm'],
+    'Doctorate/Professional': ['PhD', 'MD', 'MBBS'],
+}
+DEGREE_MAP = {degree: category for category, degrees in DEGREE_CATEGORIES.items() for degree in degrees}
+
+# Age groups, with the same bins as the notebook's pd.cut
+AGE_BINS = [0, 29, 44, 54, 65, float('inf')]
+AGE_LABELS = ['Under 25', '25-34', '35-44', '45-54', '+55']
+
+# Pressure levels shown on the pages: Low <= first bound < Medium <= second bound < High
+PRESSURE_LEVELS = ['Low', 'Medium', 'High']
+ACADEMIC_PRESSURE_BOUNDS = (4, 7)
+WORK_PRESSURE_BOUNDS = (1, 3)
+
+STUDENT_ONLY_COLUMNS = ['Academic Pressure', 'CGPA', 'Study Satisfaction']
+PROFESSIONAL_ONLY_COLUMNS = ['Work Pressure', 'Job Satisfaction', 'Profession']
+
+
+def pressure_level(values, bounds):
+    low, medium = bounds
+    return pd.cut(values, bins=[float('-inf'), low, medium, float('inf')], labels=PRESSURE_LEVELS)
+
+
+def add_page_columns(df, pressure_column, bounds):
+    # Columns the pages filter and aggregate on, derived once here instead of at every import
+    df[f'{pressure_column} Level'] = pressure_level(df[pressure_column], bounds)
+    df['Depression_numeric'] = (df['Depression'] == 'Yes').astype(np.int8)
+    return df
+
+
+def transform(chunk):
+    # Clean a chunk of the raw survey; returns (students, professionals)
+    chunk = chunk.drop(columns=['Name'])
+    chunk['Profession'] = chunk['Profession'].fillna('Uknown')
+    chunk['Work Pressure'] = chunk['Work Pressure'].fillna(0).round().astype(np.int8)
+    chunk['Job Satisfaction'] = chunk['Job Satisfaction'].fillna(0).round().astype(np.int8)
+
+    chunk['Degree'] = chunk['Degree'].map(DEGREE_MAP).fillna('Other')
+    chunk['Age'] = pd.cut(chunk['Age'], bins=AGE_BINS, labels=AGE_LABELS, include_lowest=True)
+    chunk = chunk.rename(columns={'Work/Study Hours': 'Activity Hours'})
+
+    role = chunk['Working Professional or Student']
+
+    students = chunk[role == 'Student'].drop(columns=PROFESSIONAL_ONLY_COLUMNS)
+    for column in ['Academic Pressure', 'Study Satisfaction']:
+        students[column] = students[column].round().astype(np.int8)
+    students = add_page_columns(students, 'Academic Pressure', ACADEMIC_PRESSURE_BOUNDS)
+
+    professionals = chunk[role == 'Working Professional'].drop(columns=STUDENT_ONLY_COLUMNS)
+    professionals = add_page_columns(professionals, 'Work Pressure', WORK_PRESSURE_BOUNDS)
+
+    return students, professionals
+
+
+def run(input_path=RAW_DATASET, output_dir=ASSETS_DIR, chunksize=100_000):
+    outputs = {
+        'students': os.path.join(output_dir, STUDENTS_FILE),
+        'professionals': os.path.join(output_dir, PROFESSIONALS_FILE),
+    }
+    # Write to temporary files and swap them in at the end, so the running app
+    # never reads a half-written dataset
+    tmp_paths = {name: f'{path}.tmp' for name, path in outputs.items()}
+    rows = {name: 0 for name in outputs}
+
+    files = {name: open(path, 'w', newline='') for name, path in tmp_paths.items()}
+    try:
+        for chunk in pd.read_csv(input_path, chunksize=chunksize):
+            for name, part in zip(['students', 'professionals'], transform(chunk)):
+                if part.empty:
+                    continue
+                part.to_csv(files[name], index=False, header=rows[name] == 0)
+                rows[name] += len(part)
+    finally:
+        for f in files.values():
+            f.close()
+
+    for name, path in outputs.items():
+        os.replace(tmp_paths[name], path)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the dashboard datasets from the raw survey.')
+    parser.add_argument('--input', default=RAW_DATASET)
+    parser.add_argument('--output-dir', default=ASSETS_DIR)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    for name, count in run(args.input, args.output_dir, args.chunksize).items():
+        print(f'{name}: {count} rows')
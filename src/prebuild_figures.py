@@ -0,0 +1,56 @@
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Render the figures of every page's default view (no filter, no click) at
+# deploy time. They are written to the prebuilt figure directory read by
+# figure_cache.py, so the first visit after a deploy or a worker restart reads
+# them from disk instead of loading the dataset and building them. Run after
+# src/dataset_store.py:
+#
+#   python src/prebuild_figures.py [--out assets/.figures]
+
+# page module -> default view callbacks and their number of arguments (all None)
+DEFAULT_VIEWS = {
+    'pages.students': {'update_barplot': 4, 'update_sunburst': 7, 'update_financial_stress': 5, 'update_cohort_ranking': 6},
+    'pages.professional_workers': {'update_barplot': 4, 'update_sunburst': 7, 'update_cohort_ranking': 6},
+}
+
+
+def prebuild(out):
+    # The layouts and callbacks fill the in-process figure cache, which is then written out
+    from figure_cache import PrebuiltFigures, figure_cache
+
+    for module_name, callbacks in DEFAULT_VIEWS.items():
+        module = importlib.import_module(module_name)
+        module.layout()   # Figures set in the layout itself
+        for name, n_args in callbacks.items():
+            getattr(module, name)(*[None] * n_args)
+
+    entries = figure_cache.entries()
+    PrebuiltFigures(out).write(entries)
+    return entries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prebuild the default view figures of every page.')
+    parser.add_argument('--out', default=None, help='default: FIGURE_PREBUILT_DIR, else assets/.figures')
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out or os.environ.get('FIGURE_PREBUILT_DIR') or os.path.join(SRC_DIR, '..', 'assets', '.figures'))
+    # Build everything from the data, never from the previous prebuilt figures
+    os.environ['FIGURE_PREBUILT_DIR'] = ''
+
+    # The pages resolve their data relative to src/, like under gunicorn --chdir src
+    os.chdir(SRC_DIR)
+    sys.path.insert(0, SRC_DIR)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app  # noqa: F401  (registers the pages)
+
+    entries = prebuild(out)
+    print(f'{len(entries)} figures ({sum(len(payload) for _, payload in entries) / 1024:.0f} KB) written to {out}')
@@ -0,0 +1,201 @@
+import io
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, jsonify, request
+
+import metrics
+
+# Depression risk scoring with the model saved by src/training.py:
+# POST /api/predict with one JSON record, a JSON list of records or a CSV body
+# (with header), in the raw survey columns (see features.REQUIRED_COLUMNS).
+#
+# The model is loaded once per worker, on first use, and so is features.py
+# (scikit-learn is the slowest import of the app). Requests handled at the
+# same time by a worker's threads are queued and scored together: one encoder
+# pass and one predict_proba call per batch, so the per-call overhead is paid
+# once per batch instead of once per request.
+
+MODEL_FILE = os.environ.get('MODEL_FILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models', 'depression_model.joblib')
+MAX_BATCH_ROWS = 1024
+MAX_WAIT_SECS = 0.005        # how long a batch waits for more requests
+MAX_REPORTED_ERRORS = 50
+
+blueprint = Blueprint('predict', __name__)
+
+
+class ModelUnavailable(Exception):
+    pass
+
+
+def scores(model, X):
+    # Probability of the depression class (SVC without probability estimates: sigmoid of its margin)
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(X)[:, 1]
+    return 1 / (1 + np.exp(-model.decision_function(X)))
+
+
+class MicroBatcher:
+    # Collects rows submitted from any thread for up to MAX_WAIT_SECS (or
+    # MAX_BATCH_ROWS rows) and scores them with a single call
+
+    def __init__(self, predict, max_rows=MAX_BATCH_ROWS, max_wait=MAX_WAIT_SECS):
+        self._predict = predict
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, rows):
+        # Blocks until the batch holding `rows` is scored; returns one score per row
+        if len(rows) >= self.max_rows:
+            return self._predict(rows)   # Already a batch of its own
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((rows, future))
+        return future.result()
+
+    def _ensure_thread(self):
+        # Started on first use, so it runs in the worker process and not in a forking parent
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='predict-batcher', daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        n_rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                parts = [rows for rows, _ in batch]
+                combined = pd.concat(parts, ignore_index=True)
+                metrics.PREDICT_BATCH_ROWS.observe(len(combined))
+                results = np.split(self._predict(combined), np.cumsum([len(part) for part in parts])[:-1])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class Predictor:
+    # Model artifact of this worker plus the batcher in front of it
+
+    def __init__(self, path=MODEL_FILE):
+        self.path = path
+        self._artifact = None
+        self._lock = threading.Lock()
+        self.batcher = MicroBatcher(self._score)
+
+    @property
+    def artifact(self):
+        if self._artifact is None:
+            with self._lock:
+                if self._artifact is None:
+                    if not os.path.exists(self.path):
+                        raise ModelUnavailable(f'no trained model at {self.path}; run python src/training.py')
+                    import joblib
+                    self._artifact = joblib.load(self.path)
+        return self._artifact
+
+    @property
+    def encoder(self):
+        return self.artifact['model'].named_steps['encode']
+
+    def _score(self, rows):
+        import features
+        return scores(self.artifact['model'], features.clean(rows))
+
+    def validate(self, rows):
+        # Rows the encoder cannot map are rejected instead of silently scored
+        import features
+        missing = [column for column in features.REQUIRED_COLUMNS if column not in rows.columns]
+        if missing:
+            return [{'error': 'missing columns', 'columns': missing}]
+        for column in features.OPTIONAL_COLUMNS:
+            if column not in rows.columns:
+                rows[column] = np.nan
+
+        known = {
+            'City': features.CITY_POPULATION,
+            'Dietary Habits': features.DIET_MAPPING,
+            'Sleep Duration': features.SLEEP_MAPPING,
+            'Degree': features.DEGREE_CATEGORY,
+            **{column: self.encoder.categories_[column] for column in features.DUMMY_COLUMNS},
+        }
+        errors = []
+        for column, values in known.items():
+            bad = ~rows[column].isin(list(values))
+            if column == 'Profession':
+                bad &= rows[column].notna()   # Missing for students
+            errors += [{'row': int(i), 'column': column, 'value': str(rows[column].iloc[i])} for i in np.flatnonzero(bad.to_numpy())]
+
+        for column in ['Age', 'Work/Study Hours', 'Financial Stress', 'Academic Pressure', 'Work Pressure', 'Study Satisfaction', 'Job Satisfaction']:
+            numbers = pd.to_numeric(rows[column], errors='coerce')
+            bad = numbers.isna() & (rows[column].notna() if column in features.OPTIONAL_COLUMNS else True)
+            errors += [{'row': int(i), 'column': column, 'value': str(rows[column].iloc[i])} for i in np.flatnonzero(np.asarray(bad))]
+            rows[column] = numbers
+        return errors
+
+    def predict(self, rows):
+        # Validated survey rows -> depression probability per row
+        return self.batcher.submit(rows)
+
+
+# One predictor per worker, shared by the API and the risk scoring page
+predictor = Predictor()
+
+
+def read_records(req):
+    if req.is_json:
+        body = req.get_json()
+        return pd.DataFrame([body] if isinstance(body, dict) else body)
+    return pd.read_csv(io.BytesIO(req.get_data()))
+
+
+@blueprint.route('/api/predict', methods=['POST'])
+def predict():
+    try:
+        rows = read_records(request)
+    except Exception as e:
+        return jsonify({'error': f'unreadable body: {e}'}), 400
+    if rows.empty:
+        return jsonify({'predictions': []})
+
+    try:
+        errors = predictor.validate(rows)
+        if errors:
+            return jsonify({'error': 'invalid rows', 'details': errors[:MAX_REPORTED_ERRORS], 'count': len(errors)}), 400
+        probabilities = predictor.predict(rows)
+    except ModelUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+
+    artifact = predictor.artifact
+    return jsonify({
+        'predictions': [{'probability': float(p), 'depression': bool(p >= 0.5)} for p in probabilities],
+        'model': artifact['family'],
+        'trained_at': artifact['trained_at'],
+    })
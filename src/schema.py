@@ -0,0 +1,137 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+
+# Typed schema of the dashboard datasets (assets/df_*.csv, built by
+# src/pipeline.py). Text columns are categoricals: ordered ones carry their
+# display order (Age groups, Degree levels, ...), so sorting, groupby and
+# dropdowns follow it without lookup tables. Counts and scores are int8, CGPA
+# float32. Enforced when the pages load a dataset (page_store.py) and used
+# for the memory-mapped store (dataset_store.py) and in the notebook.
+#
+#   python src/schema.py [csv ...]    # memory of the typed datasets vs pandas defaults
+
+YES_NO = ['No', 'Yes']
+SLEEP_DURATIONS = ['Less than 5 hours', '5-6 hours', '7-8 hours', 'More than 8 hours']
+DIETARY_HABITS = ['Unhealthy', 'Moderate', 'Healthy']
+
+# Closed value sets in their natural order
+ORDERED = {
+    'Age': pipeline.AGE_LABELS,
+    'Degree': list(pipeline.DEGREE_CATEGORIES) + ['Other'],
+    'Sleep Duration': SLEEP_DURATIONS,
+    'Dietary Habits': DIETARY_HABITS,
+    'Academic Pressure Level': pipeline.PRESSURE_LEVELS,
+    'Work Pressure Level': pipeline.PRESSURE_LEVELS,
+}
+# Closed value sets without an order
+UNORDERED = {
+    'Gender': ['Female', 'Male'],
+    'Working Professional or Student': ['Student', 'Working Professional'],
+    'Have you ever had suicidal thoughts ?': YES_NO,
+    'Family History of Mental Illness': YES_NO,
+    'Depression': YES_NO,
+}
+# Open value sets (new responses may add values): categories are the values seen, sorted
+OPEN = ['City', 'Profession']
+
+NUMERIC = {
+    'Academic Pressure': np.int8,
+    'Work Pressure': np.int8,
+    'Study Satisfaction': np.int8,
+    'Job Satisfaction': np.int8,
+    'Financial Stress': np.int8,
+    'Activity Hours': np.int8,
+    'Depression_numeric': np.int8,
+    'CGPA': np.float32,
+}
+
+CLOSED = {**ORDERED, **UNORDERED}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def categories(column):
+    # Allowed values of a closed column, in order
+    return CLOSED[column]
+
+
+def _categorical(column, values):
+    if column in CLOSED:
+        dtype = pd.CategoricalDtype(CLOSED[column], ordered=column in ORDERED)
+    else:
+        seen = values.cat.categories if isinstance(values.dtype, pd.CategoricalDtype) else values.dropna().unique()
+        dtype = pd.CategoricalDtype(sorted(seen))
+    if values.dtype == dtype:
+        return values
+
+    typed = values.astype(dtype)
+    unknown = typed.isna() & values.notna()
+    if unknown.any():
+        raise SchemaError(f'{column}: unexpected values {sorted(values[unknown].astype(str).unique())}')
+    return typed
+
+
+def fits(column, values):
+    # Whether the values of a numeric column can be stored in its schema type without loss
+    dtype = np.dtype(NUMERIC[column])
+    if dtype.kind != 'i' or values.dtype == dtype or values.empty:
+        return True
+    info = np.iinfo(dtype)
+    return not (values.isna().any() or (values % 1 != 0).any() or values.min() < info.min or values.max() > info.max)
+
+
+def _numeric(column, values):
+    dtype = np.dtype(NUMERIC[column])
+    if values.dtype == dtype:
+        return values
+    if not fits(column, values):
+        raise SchemaError(f'{column}: values do not fit {dtype.name}')
+    return values.astype(dtype)
+
+
+def enforce(df):
+    # df with every schema column cast to its type (other columns as they are)
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in CLOSED or column in OPEN:
+            values = _categorical(column, values)
+        elif column in NUMERIC:
+            values = _numeric(column, values)
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def memory_report(before, after):
+    # Deep memory use of a frame before and after enforce(), per column and in total
+    report = pd.DataFrame({
+        'before': before.memory_usage(deep=True, index=False),
+        'after': after.memory_usage(deep=True, index=False),
+        'before_dtype': before.dtypes.astype(str),
+        'after_dtype': after.dtypes.astype(str),
+    })
+    total_before, total_after = int(report['before'].sum()), int(report['after'].sum())
+    summary = {
+        'before_bytes': total_before,
+        'after_bytes': total_after,
+        'saved_bytes': total_before - total_after,
+        'saved_pct': 100 * (total_before - total_after) / total_before if total_before else 0.0,
+    }
+    return report, summary
+
+
+if __name__ == '__main__':
+    paths = sys.argv[1:] or [os.path.normpath(os.path.join(pipeline.ASSETS_DIR, name)) for name in [pipeline.STUDENTS_FILE, pipeline.PROFESSIONALS_FILE]]
+    for path in paths:
+        default = pd.read_csv(path)
+        report, summary = memory_report(default, enforce(default))
+        print(f"{path}: {summary['before_bytes']:,} -> {summary['after_bytes']:,} bytes "
+              f"({summary['saved_pct']:.1f}% saved)")
+        print(report.to_string(), end='\n\n')
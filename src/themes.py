@@ -0,0 +1,28 @@
+import functools
+
+# Imported at startup even though it is only used lazily: it registers Dash
+# components (its AIO theme switchers), which Dash refuses inside a callback
+import dash_bootstrap_templates
+
+# Bootstrap themes of the app as Plotly templates. Reading them costs more than
+# importing the rest of app.py, so they are registered the first time a worker
+# builds a figure instead of at startup.
+
+THEMES = ["minty", "minty_dark"]
+
+
+@functools.cache
+def load_templates():
+    import plotly.express as px
+
+    dash_bootstrap_templates.load_figure_template(THEMES)
+    px.defaults.template = "minty"  # Default to light mode
+
+
+def themed(build):
+    # Decorator for figure builders: templates are loaded before the first build
+    @functools.wraps(build)
+    def wrapper(*args, **kwargs):
+        load_templates()
+        return build(*args, **kwargs)
+    return wrapper